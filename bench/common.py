@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts: an isolated copy of data/,
+latency statistics and machine-readable result files.
+"""
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def prepare_sandbox(upstream_url: Optional[str] = None) -> Path:
+    """
+    Copy data/ into a temp directory and chdir there, so benchmarks never
+    touch the real files. Call before `import main` (it reads env at import).
+    """
+    work = Path(tempfile.mkdtemp(prefix="bench-"))
+    shutil.copytree(
+        REPO_ROOT / "data",
+        work / "data",
+        ignore=shutil.ignore_patterns(".locks", ".cache", ".changes", "catalog.db*", "*.tmp"),
+    )
+    os.chdir(work)
+
+    os.environ.setdefault("SESSION_SECRET", "bench-key")
+    os.environ["LINK_CHECK_INTERVAL"] = "0"  # never HEAD real CDNs from a benchmark
+    if upstream_url:
+        os.environ["REELS_API_URL"] = upstream_url
+    sys.path.insert(0, str(REPO_ROOT))
+    return work
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Latency summary in milliseconds for samples in seconds"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "mean_ms": round(sum(ordered) / count * 1000, 4) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+    }
+
+
+def write_results(kind: str, settings: Dict[str, Any], results: Dict[str, Any], path: str):
+    """Write a result file; pass it to --compare on a later run"""
+    document = {
+        "kind": kind,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": settings,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {path}")
+
+
+# Metrics where a larger value is better; every other metric is a latency
+HIGHER_IS_BETTER = ("rps", "mb_per_s")
+
+
+def compare_results(results: Dict[str, Any], baseline_path: str, threshold: float) -> bool:
+    """
+    Print each metric against the baseline file. Returns False when any
+    metric regressed by more than `threshold` percent.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    ok = True
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not isinstance(old, (int, float)) or not old or metric == "count":
+                continue
+            change = (value - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            if flag:
+                ok = False
+            print(f"{name:32} {metric:10} {old:12.4f} -> {value:12.4f} ({change:+6.1f}%){flag}")
+    return ok
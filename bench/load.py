@@ -0,0 +1,214 @@
+"""
+In-process ASGI load driver.
+
+Mirrors the .replit / systemd layout (gunicorn -w 4 with uvicorn workers):
+the catalog snapshot is published once, then each forked worker process
+runs the app's startup hooks and is driven directly over ASGI by its own
+virtual users, so results measure the app rather than sockets. Reels
+refreshes go to a local stub of the upstream API, so it runs offline.
+
+    python bench/load.py --duration 10 --output load.json
+    python bench/load.py --mix read-only --compare load.json
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import compare_results, prepare_sandbox, summarize, write_results
+from stub_upstream import StubUpstream
+
+# Request kind -> relative weight
+MIXES = {
+    # Home screen traffic with a trickle of admin writes
+    "mobile": {
+        "files_category": 30,
+        "files_revalidate": 15,
+        "reels_page": 20,
+        "reels_cursor": 10,
+        "category_videos": 15,
+        "search": 8,
+        "delete_video": 1.5,
+        "refresh_reels": 0.5,
+    },
+    "read-only": {
+        "files_category": 40,
+        "files_revalidate": 20,
+        "reels_page": 25,
+        "reels_cursor": 15,
+    },
+}
+
+SEARCH_TERMS = ["amateur", "big ass", "milf", "desi", "compilation", "hot wife", "teen", "ma"]
+
+
+async def virtual_user(client, mix, rng, deadline, state, samples):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    cursor = ""
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        headers = None
+        if kind == "files_category":
+            request = ("GET", f"/files/{rng.choice(state['categories'])}")
+        elif kind == "files_revalidate":
+            path = rng.choice(state["categories"])
+            etag = state["etags"].get(path)
+            request = ("GET", f"/files/{path}")
+            headers = {"If-None-Match": etag} if etag else None
+        elif kind == "reels_page":
+            request = ("GET", f"/reels?page={rng.randint(1, 3)}&limit=20")
+        elif kind == "reels_cursor":
+            request = ("GET", f"/reels?cursor={cursor}&limit=20")
+        elif kind == "category_videos":
+            category_id = rng.choice(state["categories"]).rsplit("/", 1)[1].removesuffix(".json")
+            request = ("GET", f"/categories/{category_id}/videos?page={rng.randint(1, 3)}&limit=20&fields=thumb,video")
+        elif kind == "search":
+            request = ("GET", f"/search?q={rng.choice(SEARCH_TERMS)}&limit=20")
+        elif kind == "delete_video":
+            if not state["delete_urls"]:
+                continue
+            url = state["delete_urls"].pop()
+            request = ("DELETE", "/videos", {"video_url": url})
+        else:
+            request = ("POST", "/refresh-reels")
+
+        start = time.perf_counter()
+        if request[0] == "DELETE":
+            response = await client.request("DELETE", request[1], json=request[2])
+        else:
+            response = await client.request(request[0], request[1], headers=headers)
+        elapsed = time.perf_counter() - start
+
+        entry = samples.setdefault(kind, {"latencies": [], "errors": 0, "bytes": 0})
+        entry["latencies"].append(elapsed)
+        entry["bytes"] += len(response.content)
+        if response.status_code >= 400:
+            entry["errors"] += 1
+        if kind == "files_category" and response.status_code == 200:
+            state["etags"][request[1].removeprefix("/files/")] = response.headers.get("etag")
+        if kind == "reels_cursor":
+            cursor = (response.json().get("next_cursor") or "") if response.status_code == 200 else ""
+
+
+async def run_worker(worker_id, mix, concurrency, duration, warmup, api_key):
+    import httpx
+    import main
+
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"X-API-Key": api_key}) as client:
+            categories = [p for p in main.ensure_video_index() if not p.endswith("/0.json")]
+            urls = sorted(main._video_index)
+            state = {
+                "categories": categories,
+                "etags": {},
+                # Disjoint slices so workers never race to delete the same video
+                "delete_urls": urls[worker_id::64][:500],
+            }
+
+            if warmup:
+                await asyncio.gather(*(
+                    virtual_user(client, mix, random.Random(i), time.perf_counter() + warmup, state, {})
+                    for i in range(concurrency)
+                ))
+
+            samples = {}
+            started = time.perf_counter()
+            deadline = started + duration
+            await asyncio.gather(*(
+                virtual_user(client, mix, random.Random(worker_id * 1000 + i), deadline, state, samples)
+                for i in range(concurrency)
+            ))
+            return samples, time.perf_counter() - started
+    finally:
+        await main.app.router.shutdown()
+
+
+def worker_process(worker_id, args, api_key, queue):
+    samples, elapsed = asyncio.run(
+        run_worker(worker_id, MIXES[args.mix], args.concurrency, args.duration, args.warmup, api_key)
+    )
+    queue.put((samples, elapsed))
+
+
+def aggregate(worker_results):
+    merged = {}
+    elapsed = max(e for _, e in worker_results)
+    for samples, _ in worker_results:
+        for kind, entry in samples.items():
+            total = merged.setdefault(kind, {"latencies": [], "errors": 0, "bytes": 0})
+            total["latencies"].extend(entry["latencies"])
+            total["errors"] += entry["errors"]
+            total["bytes"] += entry["bytes"]
+
+    results = {}
+    all_latencies = []
+    for kind, entry in sorted(merged.items()):
+        summary = summarize(entry["latencies"])
+        summary["rps"] = round(summary["count"] / elapsed, 1)
+        summary["errors"] = entry["errors"]
+        summary["mb_per_s"] = round(entry["bytes"] / elapsed / 1e6, 2)
+        results[kind] = summary
+        all_latencies.extend(entry["latencies"])
+    total = summarize(all_latencies)
+    total["rps"] = round(total["count"] / elapsed, 1)
+    total["errors"] = sum(r["errors"] for r in results.values())
+    results["total"] = total
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load test against the ASGI app")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes (gunicorn -w)")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users per worker")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds first")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mobile")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="stub upstream delay in seconds")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    output = str(Path(args.output).resolve()) if args.output else None
+    baseline = str(Path(args.compare).resolve()) if args.compare else None
+    stub = StubUpstream(latency=args.upstream_latency).start()
+    prepare_sandbox(upstream_url=stub.url)
+
+    import main
+
+    # What gunicorn.conf.py does in the master before forking workers
+    main.publish_catalog_snapshot()
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker_process, args=(i, args, main.API_KEY, queue))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    worker_results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    stub.stop()
+
+    results = aggregate(worker_results)
+    print(f"{'kind':20} {'count':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind, summary in results.items():
+        print(
+            f"{kind:20} {summary['count']:8} {summary['rps']:9.1f} "
+            f"{summary['p50_ms']:9.3f} {summary['p99_ms']:9.3f} {summary['errors']:7}"
+        )
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    if output:
+        write_results("load", settings, results, output)
+    if baseline and not compare_results(results, baseline, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,125 @@
+"""
+Micro-benchmarks over the real data/categoryvideo files: JSON load and
+encode, page assembly, search and deletes.
+
+    python bench/micro.py                      # print results
+    python bench/micro.py --output micro.json  # save a baseline
+    python bench/micro.py --compare micro.json # compare against it
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import compare_results, prepare_sandbox, summarize, write_results
+
+
+def measure(fn, repeat: int):
+    """Call fn repeat times; returns per-call durations in seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main_benchmarks(repeat: int):
+    import main
+
+    results = {}
+    paths = sorted(main.ensure_video_index(), key=main._category_sort_key)
+    files = [Path(main.DATA_DIR) / relpath for relpath in paths if not relpath.endswith("/0.json")]
+    total_bytes = sum(path.stat().st_size for path in files)
+
+    def record(name, samples, nbytes=None):
+        summary = summarize(samples)
+        if nbytes:
+            summary["mb_per_s"] = round(nbytes / (summary["mean_ms"] / 1000) / 1e6, 2)
+        results[name] = summary
+        print(f"{name:32} mean {summary['mean_ms']:9.3f} ms  p99 {summary['p99_ms']:9.3f} ms")
+
+    # Whole corpus per call, as a cold worker would read it
+    def load_all():
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+    record("json_load_all_files", measure(load_all, repeat), total_bytes)
+
+    corpus = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            corpus.append(json.load(f))
+    record("encode_compact_all_files", measure(lambda: [main.encode_json(d) for d in corpus], repeat), total_bytes)
+    record(
+        "encode_indent2_all_files",
+        measure(lambda: [json.dumps(d, indent=2, ensure_ascii=False) for d in corpus], repeat),
+        total_bytes,
+    )
+
+    # Pagination over one large category, from pre-encoded fragments
+    relpath = max(paths[1:], key=lambda p: (Path(main.DATA_DIR) / p).stat().st_size)
+    entry = main.load_catalog_entry(relpath)
+    videos = main.catalog_data(entry)
+
+    def build():
+        return [main.encode_json(v) for v in videos], [v.get("video", "") for v in videos]
+    record("category_view_build", measure(build, repeat))
+
+    view = main.get_cursor_view(f"bench:{relpath}", entry["etag"], build)
+    pages = max(len(videos) // 20, 1)
+    record(
+        "offset_page_limit20",
+        measure(lambda: [main.offset_page_body(view, page, 20, "videos") for page in range(1, pages + 1)], repeat),
+    )
+    results["offset_page_limit20"]["pages_per_call"] = pages
+    record(
+        "cursor_page_limit20",
+        measure(lambda: [main.cursor_page_body(view, offset, 20, "videos") for offset in range(0, len(videos), 20)], repeat),
+    )
+
+    record("search_two_words", measure(lambda: main.search_catalog("big ass"), repeat))
+    record("search_prefix", measure(lambda: main.search_catalog("am"), repeat))
+
+    # Deletes: the in-memory filter pass, then the full durable path
+    urls = {v.get("video", "") for v in videos[::10]}
+    op = {"op": "delete", "urls": urls}
+    record("apply_deletes_indexed", measure(lambda: main._apply_deletes(relpath, videos, [op]), repeat))
+    # Reversed copy: the index positions no longer match, forcing the fallback scan
+    reordered = videos[::-1]
+    record("apply_deletes_scan", measure(lambda: main._apply_deletes(relpath, reordered, [op]), repeat))
+
+    async def delete_round(count):
+        samples = []
+        candidates = [u for u in main._video_index if main._video_index[u]][:count]
+        for url in candidates:
+            targets = {path: {"op": "delete", "urls": {url}} for path in main._video_index.get(url, {})}
+            start = time.perf_counter()
+            await main.submit_mutations(targets)
+            samples.append(time.perf_counter() - start)
+        return samples
+    record("delete_video_durable", asyncio.run(delete_round(repeat)))
+
+    return results, {"repeat": repeat, "files": len(files), "bytes": total_bytes, "largest_category": relpath}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the catalog code paths")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    output = str(Path(args.output).resolve()) if args.output else None
+    baseline = str(Path(args.compare).resolve()) if args.compare else None
+    prepare_sandbox()
+    results, settings = main_benchmarks(args.repeat)
+
+    if output:
+        write_results("micro", settings, results, output)
+    if baseline and not compare_results(results, baseline, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,121 @@
+"""
+Offline stand-in for the getnextvideos upstream API and the video CDNs.
+
+Answers POST {"amount": N} with N new videos in the upstream format that
+transform_reels() expects, and HEAD / GET /links/<status>/<name> with that
+status, for the dead-link checker ("nohead" answers HEAD with 405 and the
+ranged GET with 206). Use it in-process (StubUpstream) or standalone to
+point a real gunicorn at it:
+
+    python bench/stub_upstream.py --port 8099
+    REELS_API_URL=http://127.0.0.1:8099/getnextvideos gunicorn main:app ...
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubUpstream:
+    """
+    getnextvideos / CDN stub on a background thread; latency is added per
+    request. Link requests are recorded in `link_hits` as (method, path,
+    start time) and the most concurrent ones in `max_link_in_flight`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        counter = itertools.count()
+        stub = self
+        self.link_hits = []
+        self.max_link_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                try:
+                    amount = int(json.loads(self.rfile.read(length) or b"{}").get("amount", 100))
+                except (ValueError, AttributeError):
+                    amount = 100
+                if latency:
+                    time.sleep(latency)
+
+                videos = []
+                for _ in range(max(amount, 0)):
+                    n = next(counter)
+                    videos.append({
+                        "mp4_url": f"https://stub.invalid/videos/{n}.mp4",
+                        "medium_thumb": f"https://stub.invalid/thumbs/{n}.webp",
+                        "action_name": f"stub-{n}",
+                        "video_text": {"display_video_title": {"default": {"text": f"Stub video {n}"}}},
+                    })
+                body = json.dumps({"code": 200, "data": videos}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _link(self, method):
+                with stub._lock:
+                    stub.link_hits.append((method, self.path, time.monotonic()))
+                    stub._in_flight += 1
+                    stub.max_link_in_flight = max(stub.max_link_in_flight, stub._in_flight)
+                try:
+                    if latency:
+                        time.sleep(latency)
+                    parts = self.path.split("/")
+                    kind = parts[2] if len(parts) > 3 and parts[1] == "links" else "404"
+                    if kind == "nohead":
+                        status = 405 if method == "HEAD" else 206
+                    else:
+                        status = int(kind) if kind.isdigit() else 404
+                    self.send_response(status)
+                    self.send_header("Content-Length", "1" if method == "GET" else "0")
+                    self.end_headers()
+                    if method == "GET":
+                        self.wfile.write(b"x")
+                finally:
+                    with stub._lock:
+                        stub._in_flight -= 1
+
+            def do_HEAD(self):
+                self._link("HEAD")
+
+            def do_GET(self):
+                self._link("GET")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_port}"
+        self.url = f"{self.base_url}/getnextvideos"
+
+    def link(self, status, name: str) -> str:
+        """URL the stub answers with `status` (an int or "nohead")"""
+        return f"{self.base_url}/links/{status}/{name}"
+
+    def start(self) -> "StubUpstream":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub getnextvideos upstream and CDN")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    args = parser.parse_args()
+
+    stub = StubUpstream(args.host, args.port, args.latency)
+    print(f"Serving {stub.url}")
+    stub.server.serve_forever()
@@ -0,0 +1,17 @@
+# Gunicorn loads this file automatically from the working directory.
+# Command line flags (workers, bind, max-requests, ...) still apply on top.
+import subprocess
+import sys
+
+
+def on_starting(server):
+    """
+    Publish the shared catalog snapshot once, before workers fork.
+    
+    Runs in a child process: importing main in the master would hand every
+    forked worker its storage connection and parsed catalog. If it fails,
+    the first worker publishes instead.
+    """
+    result = subprocess.run([sys.executable, "-c", "import main; main.publish_catalog_snapshot()"])
+    if result.returncode != 0:
+        server.log.warning(f"Catalog snapshot publish exited with {result.returncode}")
@@ -1,16 +1,43 @@
 import os
 import json
+import base64
+import gzip
+import hashlib
+import html
+import sqlite3
 import asyncio
+import importlib.util
+import fcntl
+import mmap
 import tempfile
 import logging
+import marshal
+import math
+import re
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Depends, Header, Query, Body
-from typing import Optional, Dict, Any, List
+from urllib.parse import urlencode, urlsplit
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Body, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional, Dict, Any, List, Iterable, Iterator
 from pydantic import BaseModel, HttpUrl
 import httpx
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+try:
+    import brotli
+except ImportError:  # brotli is optional; clients then get gzip or identity
+    brotli = None
+
 # Load environment variables from .env file if it exists
 load_dotenv()
 
@@ -19,11 +46,168 @@ DATA_DIR = "data"
 API_KEY = os.getenv("SESSION_SECRET")
 
 # In-memory cache for reels data
-_reels_cache = {"data": None, "timestamp": None, "ttl": 300}  # 5 min cache
+_reels_cache = {"data": None, "timestamp": None, "ttl": 300, "version": 0}  # 5 min cache
+
+# Encoded /reels pages for the current reels version, keyed by (page, limit),
+# plus "file" for the whole reels.json body
+_reels_pages: Dict[Any, Dict[str, Any]] = {}
+
+# Cursor pagination: versioned lists of pre-encoded item fragments. A view
+# stays available for CURSOR_GRACE_SECONDS after a newer version replaces it.
+CURSOR_GRACE_SECONDS = float(os.getenv("CURSOR_GRACE_SECONDS", "600"))
+CURSOR_MAX_VIEWS = int(os.getenv("CURSOR_MAX_VIEWS", "256"))
+_cursor_views: Dict[Any, Dict[str, Any]] = {}  # (resource, version) -> view
+_reels_fragments: Dict[str, bytes] = {}  # video URL -> encoded reel item
+
+# Mixed "for you" feed: a global table of unique items (integer ids in
+# per-source ranges) per catalog version; the newest few are kept for cursors
+FEED_MAX_TABLES = 4
+_feed_tables: Dict[str, Dict[str, Any]] = OrderedDict()  # version -> table
+
+# Precomputed orderings of livestream.json models, rebuilt when its ETag changes
+LIVESTREAM_PATH = "livestream/livestream.json"
+_livestream = {"etag": None, "models": [], "orders": {}, "groups": {}, "live": [], "pages": {}}
+
+# Bodies smaller than this are never compressed
+COMPRESS_MIN_BYTES = 512
+
+# Storage backend for data files: "json" (files under DATA_DIR) or "sqlite"
+# (categoryvideo files in CATALOG_DB, everything else still JSON files)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+CATALOG_DB = os.getenv("CATALOG_DB", os.path.join(DATA_DIR, "catalog.db"))
+_storage = None
+
+# In-memory catalog of every file under DATA_DIR, keyed by relative path.
+# Each entry keeps the parsed object and the pre-encoded response body so
+# /files/{filepath} is a dictionary lookup plus a byte write.
+CATALOG_MAX_BYTES = int(os.getenv("CATALOG_MAX_BYTES", str(256 * 1024 * 1024)))
+CATALOG_REVALIDATE_SECONDS = float(os.getenv("CATALOG_REVALIDATE_SECONDS", "1.0"))
+# Files larger than this are never cached; /files streams them instead
+CATALOG_MAX_ENTRY_BYTES = int(os.getenv("CATALOG_MAX_ENTRY_BYTES", str(16 * 1024 * 1024)))
+STREAM_CHUNK_BYTES = 64 * 1024
+_compact_files: Dict[str, Any] = {}  # relpath -> version token known to be compact JSON
+_catalog: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # LRU order
+_catalog_stats = {"bytes": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+# Shared catalog snapshot: every file's encoded bodies in one file that all
+# gunicorn workers mmap read-only, so the page cache holds a single copy.
+# Published in the gunicorn master (gunicorn.conf.py) or by the first worker,
+# and republished after local writes.
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", os.path.join(DATA_DIR, ".cache", "catalog.snap"))
+SNAPSHOT_PUBLISH_DELAY = float(os.getenv("SNAPSHOT_PUBLISH_DELAY", "5"))  # seconds
+SNAPSHOT_MAGIC = b"CATSNAP1"
+SNAPSHOT_TERMS_FORMAT = sys.implementation.cache_tag  # marshal data is interpreter specific
+_snapshot = {"generation": None, "stat": None, "checked": 0.0, "publish_task": None}
+
+# Reverse index from category item "video" URL to {relpath: [positions]},
+# kept in sync whenever a category file is (re)loaded into the catalog
+_video_index: Dict[str, Dict[str, List[int]]] = {}
+_indexed_files: Dict[str, set] = {}  # relpath -> URLs indexed for that file
+_stream_index_tokens: Dict[str, Any] = {}  # stream-only relpath -> version token indexed
+
+# Inverted search index over video_text and category of every category item.
+# Postings map a normalized token to {doc_id: weight}; docs are reused across
+# reloads of a file when the item's text has not changed. Docs do not keep
+# the item itself (that would pin every parsed file in every worker);
+# results are read back from the catalog entry via _video_index.
+SEARCH_TITLE_WEIGHT = 1.0
+SEARCH_CATEGORY_WEIGHT = 0.5
+SEARCH_MAX_PREFIX_TERMS = 50
+_search = {
+    "docs": [],        # doc_id -> {"file", "url", "text", "terms": (token, ...)} or None when free
+    "free": [],        # reusable doc ids
+    "postings": {},    # token -> {doc_id: weight}
+    "files": {},       # relpath -> {video URL: doc_id}
+    "vocab": None,     # sorted tokens for prefix lookups, rebuilt when None
+    "weights": {},     # one shared float object per distinct weight
+}
+
+# Category mutations waiting to be applied, coalesced per file. Each file is
+# rewritten once per batch under a cross-worker lock.
+MUTATION_BATCH_WINDOW = float(os.getenv("MUTATION_BATCH_WINDOW", "0.05"))  # seconds
+_mutation_queue = {"pending": {}, "task": None}  # relpath -> [(op, future)]
+
+# Versioned change log of catalog mutations (JSONL, shared by all workers).
+# Compaction drops the oldest records; clients behind the floor resync.
+CHANGES_MAX_RECORDS = int(os.getenv("CHANGES_MAX_RECORDS", "10000"))
+CHANGES_RETENTION_SECONDS = float(os.getenv("CHANGES_RETENTION_SECONDS", str(7 * 24 * 3600)))
+CHANGES_MAX_BYTES = int(os.getenv("CHANGES_MAX_BYTES", str(4 * 1024 * 1024)))  # every worker holds the parsed log
+_changes = {"records": [], "floor": 0, "version": 0, "token": None, "offset": 0}
 
 # Background task control
 _background_task = None
-_refresh_lock = asyncio.Lock()
+_warmup = {"task": None, "ready": False, "indexed": False, "started": time.monotonic(), "seconds": None}
+_refresh_lock = asyncio.Lock()  # serializes upstream fetches within this worker
+
+# Reels refresh leader election across gunicorn workers (flock lease)
+REELS_REFRESH_SECONDS = 300  # 5 minutes
+REELS_POLL_SECONDS = float(os.getenv("REELS_POLL_SECONDS", "5"))
+REELS_REFRESH_MAX_BACKOFF = float(os.getenv("REELS_REFRESH_MAX_BACKOFF", "3600"))  # seconds after repeated failures
+_leader = {"lock_file": None}
+
+# Rolling reels pool: reels.json (compacted) plus an append-only reels.log
+REELS_POOL_MAX = int(os.getenv("REELS_POOL_MAX", "1000"))
+REELS_MAX_AGE = float(os.getenv("REELS_MAX_AGE", str(24 * 3600)))  # seconds
+REELS_COMPACT_BYTES = int(os.getenv("REELS_COMPACT_BYTES", str(1024 * 1024)))
+_reels_pool = {"items": [], "added": {}, "base_token": None, "log_offset": 0, "compacted_size": 0}
+
+# Upstream reels API client: one pooled client per worker, created lazily
+REELS_API_URL = os.getenv("REELS_API_URL", "https://apiv2.tik.porn/getnextvideos")
+REELS_FETCH_AMOUNT = int(os.getenv("REELS_FETCH_AMOUNT", "100"))
+REELS_FETCH_BATCHES = int(os.getenv("REELS_FETCH_BATCHES", "1"))  # concurrent requests per refresh
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "0") == "1"  # needs the h2 package
+UPSTREAM_HEDGE_AFTER = float(os.getenv("UPSTREAM_HEDGE_AFTER", "0"))  # seconds, 0 disables hedging
+_http_client = {"client": None, "loop": None}
+
+# Dead-link pruning: the reels leader HEADs every thumb / video URL whose
+# last result is older than LINK_CHECK_TTL and prunes (or marks) dead items.
+# Opt-in, since a transient CDN 404 would otherwise delete content
+LINK_CHECK_INTERVAL = float(os.getenv("LINK_CHECK_INTERVAL", "0"))  # seconds, 0 disables (e.g. 21600)
+LINK_CHECK_TTL = float(os.getenv("LINK_CHECK_TTL", str(24 * 3600)))
+LINK_CHECK_CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", "8"))
+LINK_CHECK_PER_HOST = int(os.getenv("LINK_CHECK_PER_HOST", "2"))  # requests in flight per host
+LINK_CHECK_HOST_RPS = float(os.getenv("LINK_CHECK_HOST_RPS", "5"))  # request starts per second per host
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", "10"))
+LINK_CHECK_MODE = os.getenv("LINK_CHECK_MODE", "prune")  # prune | mark
+LINK_DEAD_STATUSES = {int(s) for s in os.getenv("LINK_DEAD_STATUSES", "404,410").split(",") if s.strip()}
+LINK_CHECK_CACHE = os.path.join(DATA_DIR, ".cache", "links.json")
+LINK_CHECK_STATUS = os.path.join(DATA_DIR, ".cache", "link-check.json")  # last / running pass, any worker
+_link_check = {"results": None, "last_pass": 0.0, "task": None}  # results: url -> [alive, checked_at]
+_link_check_lock = asyncio.Lock()
+
+# Prometheus metrics. Each worker counts on its own and dumps its totals to
+# METRICS_DIR; /metrics merges all workers, folding exited ones into
+# retired.json so counters never go backwards.
+METRICS_DIR = os.path.join(DATA_DIR, ".cache", "metrics")
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_metrics: Dict[str, Dict[tuple, Any]] = {}  # name -> {((label, value), ...): count or histogram}
+METRIC_HELP = {
+    "http_requests_total": ("counter", "Requests by route, method and status"),
+    "http_request_duration_seconds": ("histogram", "Time to the last response byte by route"),
+    "http_response_bytes_total": ("counter", "Response body bytes sent by route"),
+    "catalog_cache_requests_total": ("counter", "Catalog lookups by result"),
+    "catalog_evictions_total": ("counter", "Catalog entries evicted for the memory budget"),
+    "reels_cache_requests_total": ("counter", "In-memory reels cache lookups by /reels by result"),
+    "reels_refresh_total": ("counter", "Upstream reels fetches by result"),
+    "reels_refresh_duration_seconds": ("histogram", "Upstream reels fetch time"),
+    "upstream_retries_total": ("counter", "Reels API retries after rate limiting or connection errors"),
+    "upstream_hedged_requests_total": ("counter", "Hedged reels API requests sent"),
+    "delete_requests_total": ("counter", "DELETE /videos calls"),
+    "delete_files_scanned_total": ("counter", "Category files read by DELETE /videos"),
+    "delete_files_rewritten_total": ("counter", "Category files rewritten by DELETE /videos"),
+    "delete_videos_removed_total": ("counter", "Videos removed by DELETE /videos"),
+    "delete_index_fallback_scans_total": ("counter", "Delete batches that scanned a whole file (stale index)"),
+    "link_checks_total": ("counter", "Dead-link URL checks by result"),
+    "catalog_bytes": ("gauge", "Bytes held by the worker's catalog"),
+    "catalog_entries": ("gauge", "Files held by the worker's catalog"),
+    "reels_cache_age_seconds": ("gauge", "Age of the worker's reels cache"),
+    "reels_pool_items": ("gauge", "Videos in the worker's reels pool"),
+}
+
+# Opt-in sampling profiler for live workers (POST /debug/profile)
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_MAX_SECONDS = 60
+_profiler = {"running": False}
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -33,27 +217,1531 @@ def verify_api_key(x_api_key: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
     return x_api_key
 
+def encode_json(data: Any) -> bytes:
+    """Encode data the same way FastAPI's JSONResponse does"""
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def resolve_data_file(filepath: str) -> Path:
+    """Validate a client supplied path and resolve it inside DATA_DIR"""
+    # Enforce .json extension
+    if not filepath.endswith('.json'):
+        raise HTTPException(status_code=400, detail="Only .json files are allowed")
+    
+    # Prevent directory traversal attacks (allow forward slashes for subdirs)
+    if '..' in filepath or '\\' in filepath:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    # Construct and validate the file path
+    data_path = Path(DATA_DIR).resolve()
+    file_path = (data_path / filepath).resolve()
+    
+    # Ensure the resolved path is within the data directory
+    if not file_path.is_relative_to(data_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return file_path
+
+def build_encoded_entry(body: bytes, modified: float) -> Dict[str, Any]:
+    """Wrap an encoded body with its strong ETag and Last-Modified validators"""
+    return {
+        "body": body,
+        "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        "last_modified": formatdate(modified, usegmt=True),
+        "modified": int(modified),
+        "encodings": {},  # lazily filled with gzip / br variants
+        "cost": len(body),
+    }
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """Return the content codings we can serve, best first, per Accept-Encoding"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    
+    wildcard = weights.get("*", 0.0)
+    candidates = []
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        q = weights.get(coding, wildcard)
+        if q > 0:
+            candidates.append((q, coding))
+    # Stable sort keeps br ahead of gzip when weights tie
+    return [coding for q, coding in sorted(candidates, key=lambda c: -c[0])]
+
+def _encoded_body(entry: Dict[str, Any], coding: str) -> bytes:
+    """Return (and remember) the body compressed with the given coding"""
+    body = entry["encodings"].get(coding)
+    if body is None:
+        if coding == "br":
+            body = brotli.compress(bytes(entry["body"]), quality=5)
+        else:
+            body = gzip.compress(entry["body"], compresslevel=6, mtime=0)
+        entry["encodings"][coding] = body
+        entry["cost"] += len(body)
+        if _catalog.get(entry.get("path")) is entry:
+            _catalog_stats["bytes"] += len(body)
+    return body
+
+def _not_modified(request: Request, entry: Dict[str, Any]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against an entry"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return entry["etag"].removeprefix("W/") in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return entry["modified"] <= since
+    return False
+
+def cached_response(request: Request, entry: Dict[str, Any]) -> Response:
+    """Serve an encoded entry with validators, 304 handling and content negotiation"""
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    
+    body = entry["body"]
+    if len(body) >= COMPRESS_MIN_BYTES:
+        codings = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        if codings:
+            body = _encoded_body(entry, codings[0])
+            headers["Content-Encoding"] = codings[0]
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class JsonFileStorage:
+    """Data files stored as JSON documents under a root directory"""
+    
+    def __init__(self, root: str):
+        self.root = Path(root)
+    
+    def list_paths(self, prefix: str = "") -> List[str]:
+        """Relative paths of every .json file under root/prefix"""
+        base = self.root / prefix
+        if not base.exists():
+            return []
+        return [p.relative_to(self.root).as_posix() for p in base.rglob("*.json")]
+    
+    def stat(self, relpath: str):
+        """Return (version token, modified timestamp); raises FileNotFoundError"""
+        stat = (self.root / relpath).stat()
+        return (stat.st_mtime_ns, stat.st_size), stat.st_mtime
+    
+    def read(self, relpath: str) -> Any:
+        with open(self.root / relpath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    def size_hint(self, relpath: str) -> Optional[int]:
+        """Stored size in bytes, or None if unknown / missing"""
+        try:
+            return (self.root / relpath).stat().st_size
+        except OSError:
+            return None
+    
+    def write(self, relpath: str, data: Any):
+        _write_category_file(self.root / relpath, data)
+
+class SqliteCatalogStorage:
+    """
+    categoryvideo files stored in SQLite, other paths delegated to JSON files.
+    
+    Video lists are stored one row per item with the thumb host, size and
+    category interned in a strings table; files that are not a list of
+    plain video items are kept as one compact JSON document.
+    """
+    
+    PREFIX = "categoryvideo/"
+    ITEM_KEYS = ("thumb", "video", "video_text", "size", "length", "category")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS strings (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            modified REAL NOT NULL,
+            document TEXT
+        );
+        CREATE TABLE IF NOT EXISTS items (
+            path TEXT NOT NULL,
+            pos INTEGER NOT NULL,
+            thumb_host INTEGER,
+            thumb TEXT,
+            video TEXT,
+            video_text TEXT,
+            size INTEGER,
+            length TEXT,
+            category INTEGER,
+            PRIMARY KEY (path, pos)
+        ) WITHOUT ROWID;
+    """
+    
+    def __init__(self, db_path: str, fallback: JsonFileStorage):
+        self.db_path = db_path
+        self.fallback = fallback
+        self._conn = None
+        self._string_ids: Dict[str, int] = {}
+        self._strings: Dict[int, str] = {}
+    
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily so each gunicorn worker gets its own connection after fork
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def _intern(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            db = self._db()
+            db.execute("INSERT OR IGNORE INTO strings (value) VALUES (?)", (value,))
+            string_id = db.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()[0]
+            self._string_ids[value] = string_id
+            self._strings[string_id] = value
+        return string_id
+    
+    def _lookup(self, string_id: Optional[int]) -> Optional[str]:
+        if string_id is None:
+            return None
+        value = self._strings.get(string_id)
+        if value is None:
+            # Interned by another worker since we last loaded the table
+            for sid, text in self._db().execute("SELECT id, value FROM strings"):
+                self._strings[sid] = text
+                self._string_ids[text] = sid
+            value = self._strings[string_id]
+        return value
+    
+    @staticmethod
+    def _split_thumb(thumb: str):
+        """Split a thumb URL into its scheme+host prefix and the remainder"""
+        scheme, sep, rest = thumb.partition("://")
+        host, slash, path = rest.partition("/")
+        if not sep or not slash:
+            return None, thumb
+        return f"{scheme}://{host}/", path
+    
+    def _item_row(self, relpath: str, pos: int, item: Any):
+        """Row tuple for a plain video item, or None if it needs a document"""
+        if not isinstance(item, dict) or tuple(item) != self.ITEM_KEYS:
+            return None
+        if not all(isinstance(item[k], str) for k in ("thumb", "video", "video_text")):
+            return None
+        if not all(item[k] is None or isinstance(item[k], str) for k in ("size", "category")):
+            return None
+        host, thumb = self._split_thumb(item["thumb"])
+        return (
+            relpath, pos, self._intern(host), thumb, item["video"], item["video_text"],
+            self._intern(item["size"]), json.dumps(item["length"]), self._intern(item["category"])
+        )
+    
+    def list_paths(self, prefix: str = "") -> List[str]:
+        paths = [p for p in self.fallback.list_paths(prefix) if not p.startswith(self.PREFIX)]
+        if self.PREFIX.startswith(prefix) or prefix.startswith(self.PREFIX):
+            rows = self._db().execute("SELECT path FROM files WHERE path LIKE ?", (prefix + "%",))
+            paths.extend(row[0] for row in rows)
+        return paths
+    
+    def stat(self, relpath: str):
+        if not relpath.startswith(self.PREFIX):
+            return self.fallback.stat(relpath)
+        row = self._db().execute(
+            "SELECT version, modified FROM files WHERE path = ?", (relpath,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(relpath)
+        return (row[0],), row[1]
+    
+    def size_hint(self, relpath: str) -> Optional[int]:
+        # Rows are never streamed; only delegated JSON files have a size
+        if not relpath.startswith(self.PREFIX):
+            return self.fallback.size_hint(relpath)
+        return None
+    
+    def read(self, relpath: str) -> Any:
+        if not relpath.startswith(self.PREFIX):
+            return self.fallback.read(relpath)
+        db = self._db()
+        row = db.execute("SELECT document FROM files WHERE path = ?", (relpath,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(relpath)
+        if row[0] is not None:
+            return json.loads(row[0])
+        
+        items = []
+        rows = db.execute(
+            "SELECT thumb_host, thumb, video, video_text, size, length, category "
+            "FROM items WHERE path = ? ORDER BY pos", (relpath,)
+        )
+        for host, thumb, video, video_text, size, length, category in rows:
+            items.append({
+                "thumb": (self._lookup(host) or "") + thumb,
+                "video": video,
+                "video_text": video_text,
+                "size": self._lookup(size),
+                "length": json.loads(length),
+                "category": self._lookup(category),
+            })
+        return items
+    
+    def write(self, relpath: str, data: Any):
+        if not relpath.startswith(self.PREFIX):
+            return self.fallback.write(relpath, data)
+        db = self._db()
+        try:
+            self._write_items(db, relpath, data)
+        except Exception:
+            # Interned ids from a rolled back transaction are not valid
+            self._string_ids.clear()
+            self._strings.clear()
+            raise
+    
+    def _write_items(self, db: sqlite3.Connection, relpath: str, data: Any):
+        with db:
+            rows = None
+            if isinstance(data, list):
+                rows = [self._item_row(relpath, pos, item) for pos, item in enumerate(data)]
+                if not all(rows):
+                    rows = None
+            document = None if rows is not None else json.dumps(data, ensure_ascii=False)
+            
+            db.execute(
+                "INSERT INTO files (path, version, modified, document) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET version = version + 1, "
+                "modified = excluded.modified, document = excluded.document",
+                (relpath, time.time(), document)
+            )
+            db.execute("DELETE FROM items WHERE path = ?", (relpath,))
+            if rows:
+                db.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+def get_storage():
+    """Return the configured storage backend for this process"""
+    global _storage
+    if _storage is None:
+        json_storage = JsonFileStorage(DATA_DIR)
+        if STORAGE_BACKEND == "sqlite":
+            _storage = SqliteCatalogStorage(CATALOG_DB, json_storage)
+        else:
+            _storage = json_storage
+    return _storage
+
+def import_json_to_sqlite(db_path: str = CATALOG_DB) -> int:
+    """Copy every categoryvideo JSON file into the SQLite catalog"""
+    source = JsonFileStorage(DATA_DIR)
+    target = SqliteCatalogStorage(db_path, source)
+    paths = source.list_paths(SqliteCatalogStorage.PREFIX)
+    for relpath in paths:
+        target.write(relpath, source.read(relpath))
+    return len(paths)
+
+def export_sqlite_to_json(db_path: str = CATALOG_DB) -> int:
+    """Write every categoryvideo file in the SQLite catalog back as JSON"""
+    target = JsonFileStorage(DATA_DIR)
+    source = SqliteCatalogStorage(db_path, target)
+    paths = source.list_paths(SqliteCatalogStorage.PREFIX)
+    for relpath in paths:
+        (Path(DATA_DIR) / relpath).parent.mkdir(parents=True, exist_ok=True)
+        target.write(relpath, source.read(relpath))
+    return len(paths)
+
+def _prune_cursor_views():
+    """Drop views superseded longer than the grace period ago, then cap the count"""
+    now = time.monotonic()
+    expired = [
+        key for key, view in _cursor_views.items()
+        if view["superseded"] is not None and now - view["superseded"] > CURSOR_GRACE_SECONDS
+    ]
+    for key in expired:
+        del _cursor_views[key]
+    
+    # Least recently used first (views move to the end when used)
+    while len(_cursor_views) > CURSOR_MAX_VIEWS:
+        del _cursor_views[next(iter(_cursor_views))]
+
+def get_cursor_view(resource: str, version: str, build) -> Dict[str, Any]:
+    """
+    Return the current view of a resource, building it on first use.
+    
+    build() returns (fragments, keys): the encoded items and a stable key
+    per item (e.g. its video URL) used to resume cursors from other views.
+    """
+    key = (resource, version)
+    view = _cursor_views.pop(key, None)
+    if view is not None:
+        _cursor_views[key] = view
+    else:
+        fragments, keys = build()
+        
+        _prune_cursor_views()
+        now = time.monotonic()
+        for other in _cursor_views.values():
+            if other["resource"] == resource and other["superseded"] is None:
+                other["superseded"] = now
+        view = {
+            "resource": resource,
+            "version": version,
+            "fragments": fragments,
+            "keys": keys,
+            "positions": None,  # key -> index, built on demand
+            "superseded": None,
+        }
+        _cursor_views[key] = view
+    return view
+
+def encode_cursor(resource: str, version: str, offset: int, anchor: Optional[str]) -> str:
+    """Opaque cursor: the view version, an offset into it and the next item's key"""
+    raw = json.dumps([resource, version, offset, anchor], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+def resolve_cursor(resource: str, cursor: str, current: Dict[str, Any]):
+    """
+    Map a cursor to (view, offset). An empty cursor starts at the current view.
+    
+    If the cursor's view has expired, or was built by another worker, the
+    page continues from its anchor item in the current view.
+    """
+    if not cursor:
+        return current, 0
+    
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_resource, version, offset, anchor = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (
+        cursor_resource != resource or not isinstance(version, str)
+        or not isinstance(offset, int) or offset < 0 or not isinstance(anchor, (str, type(None)))
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    view = _cursor_views.get((resource, version))
+    if view is not None:
+        return view, offset
+    
+    if anchor is None:
+        return current, len(current["fragments"])
+    if current["positions"] is None:
+        current["positions"] = {key: i for i, key in enumerate(current["keys"])}
+    position = current["positions"].get(anchor)
+    if position is None:
+        raise HTTPException(status_code=410, detail="Cursor expired, restart from the first page")
+    return current, position
+
+def cursor_page_body(
+    view: Dict[str, Any],
+    offset: int,
+    limit: int,
+    items_key: str,
+    extra: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """Assemble a cursor page from pre-encoded fragments without re-encoding items"""
+    fragments = view["fragments"][offset:offset + limit]
+    end = offset + len(fragments)
+    has_next = end < len(view["fragments"])
+    head = dict(extra or {})
+    head.update({
+        "limit": limit,
+        "total_items": len(view["fragments"]),
+        "has_next": has_next,
+        "next_cursor": encode_cursor(view["resource"], view["version"], end, view["keys"][end]) if has_next else None,
+    })
+    return splice_items(head, items_key, fragments)
+
+def offset_page_body(view: Dict[str, Any], page: int, limit: int, items_key: str) -> bytes:
+    """Assemble a page/limit page from pre-encoded fragments (same shape as /reels)"""
+    start_idx = (page - 1) * limit
+    return page_body(len(view["fragments"]), page, limit, items_key, view["fragments"][start_idx:start_idx + limit])
+
+def page_body(total_items: int, page: int, limit: int, items_key: str, fragments: List[bytes]) -> bytes:
+    """Page envelope around one page of pre-encoded items"""
+    total_pages = (total_items + limit - 1) // limit  # Ceiling division
+    if page > total_pages and total_pages > 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Page {page} not found. Total pages: {total_pages}"
+        )
+    
+    head = {
+        "page": page,
+        "limit": limit,
+        "total_items": total_items,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_previous": page > 1,
+    }
+    return splice_items(head, items_key, fragments)
+
+def splice_items(head: Dict[str, Any], items_key: str, fragments: List[bytes]) -> bytes:
+    """Encode head and append an array of already-encoded items as items_key"""
+    # encode_json(head) ends with "}"; splice the item array in before it
+    return (
+        encode_json(head)[:-1]
+        + f',"{items_key}":['.encode("utf-8")
+        + b",".join(fragments)
+        + b"]}"
+    )
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """Parse a fields=a,b projection parameter; None means whole items"""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    return names or None
+
+def project_item(item: Any, fields: Optional[tuple]) -> Any:
+    """Keep only the requested fields of an item, in the requested order"""
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {name: item[name] for name in fields if name in item}
+
+def _build_reels_view():
+    """Encode each reel once, reusing fragments from earlier versions"""
+    fragments = []
+    keys = []
+    encoded = {}
+    for reel in _reels_cache["data"].get("reels", []):
+        fragment = _reels_fragments.get(reel["video"]) or encode_json(reel)
+        encoded[reel["video"]] = fragment
+        fragments.append(fragment)
+        keys.append(reel["video"])
+    _reels_fragments.clear()
+    _reels_fragments.update(encoded)
+    return fragments, keys
+
+def reels_content_version() -> str:
+    """Identify the reels pool state the same way in every worker"""
+    base_token = _reels_pool["base_token"] or (0, 0, 0)
+    return "{}.{}.{}.{}".format(*base_token, _reels_pool["log_offset"])
+
+def is_stream_only(relpath: str) -> bool:
+    """True for files too large to keep in the catalog"""
+    size = get_storage().size_hint(relpath)
+    return size is not None and size > CATALOG_MAX_ENTRY_BYTES
+
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+# Number characters running to the end of the buffer: the number may continue in the next chunk
+_JSON_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+def iter_json_items(f, state: Dict[str, Any]) -> Iterator[tuple]:
+    """
+    Decode a top-level JSON array item by item while reading a text file in
+    chunks, so memory stays around one chunk plus the largest item. Yields
+    (item, source text) pairs.
+    
+    Raises ValueError on the first next() if the document is not an array.
+    Clears state["compact"] if any whitespace separates the items.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    expect = "["  # "[", "item_or_end", "item", "sep"
+    state["compact"] = True
+    
+    while True:
+        end = _JSON_WS.match(buf, pos).end()
+        if end > pos:
+            state["compact"] = False
+            pos = end
+        if pos == len(buf):
+            if eof:
+                if expect is None:
+                    return
+                raise ValueError("Truncated JSON array")
+            chunk = f.read(STREAM_CHUNK_BYTES)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        
+        if expect is None:
+            raise ValueError("Extra data after JSON array")
+        ch = buf[pos]
+        if expect == "[":
+            if ch != "[":
+                raise ValueError("Not a JSON array")
+            pos += 1
+            expect = "item_or_end"
+            continue
+        if ch == "]" and expect in ("item_or_end", "sep"):
+            pos += 1
+            expect = None
+            continue
+        if expect == "sep":
+            if ch != ",":
+                raise ValueError("Expected ',' in JSON array")
+            pos += 1
+            expect = "item"
+            continue
+        
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = len(buf)  # item continues past the buffer
+        if not eof and (end == len(buf) or (type(item) in (int, float) and _JSON_NUMBER_TAIL.match(buf, end))):
+            # Could be cut short (e.g. a number split at "." or "e"); read more and decode again
+            chunk = f.read(STREAM_CHUNK_BYTES)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        
+        yield item, buf[pos:end]
+        pos = end
+        expect = "sep"
+
+def iter_json_array(f, state: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Re-encode a top-level JSON array as compact JSON, item by item (see
+    iter_json_items). Raises ValueError before yielding anything if the
+    document is not an array. Sets state["compact"] to whether the input was
+    already exactly compact JSON.
+    """
+    items = iter_json_items(f, state)
+    pending = next(items, None)
+    yield b"["
+    separator = b""
+    while pending is not None:
+        item, source = pending
+        encoded = encode_json(item)
+        if state["compact"] and source.encode("utf-8") != encoded:
+            state["compact"] = False
+        yield separator + encoded
+        separator = b","
+        pending = next(items, None)
+    yield b"]"
+
+def iter_stream_items(relpath: str) -> Iterator[Any]:
+    """Items of a stream-only category file, parsed one at a time from disk"""
+    with open(Path(DATA_DIR) / relpath, "r", encoding="utf-8") as f:
+        for item, _ in iter_json_items(f, {}):
+            yield item
+
+def iter_json_file(relpath: str, token: Any) -> Iterator[bytes]:
+    """
+    Stream a stored JSON file as compact JSON: raw bytes when it is known to
+    be compact already, re-encoded array items otherwise, and a one-shot
+    encode for documents that are not arrays.
+    """
+    path = Path(DATA_DIR) / relpath
+    if _compact_files.get(relpath) == token:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    
+    state = {}
+    with open(path, "r", encoding="utf-8") as f:
+        items = iter_json_array(f, state)
+        try:
+            first = next(items)
+        except ValueError:
+            first = None
+        
+        if first is None:
+            f.seek(0)
+            body = encode_json(json.load(f))
+            for start in range(0, len(body), STREAM_CHUNK_BYTES):
+                yield body[start:start + STREAM_CHUNK_BYTES]
+            return
+        
+        yield first
+        yield from items
+    
+    if state["compact"]:
+        _compact_files[relpath] = token
+
+def _gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+def stream_file_response(request: Request, relpath: str) -> Response:
+    """Serve a large, uncached file in bounded memory with weak validators"""
+    token, modified = get_storage().stat(relpath)
+    validators = {
+        "etag": 'W/"' + hashlib.blake2b(repr(token).encode("utf-8"), digest_size=16).hexdigest() + '"',
+        "modified": int(modified),
+    }
+    headers = {
+        "ETag": validators["etag"],
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, validators):
+        return Response(status_code=304, headers=headers)
+    
+    chunks = iter_json_file(relpath, token)
+    if "gzip" in _accepted_encodings(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip_chunks(chunks)
+    return StreamingResponse(chunks, media_type="application/json", headers=headers)
+
+def _evict_catalog_entries():
+    """Drop least recently used entries until the catalog fits its memory budget"""
+    # Never evict the most recently used entry (usually the one just stored)
+    for relpath in list(_catalog)[:-1]:
+        if _catalog_stats["bytes"] <= CATALOG_MAX_BYTES:
+            break
+        entry = _catalog[relpath]
+        if entry["cost"] == 0:
+            continue
+        
+        _catalog_stats["bytes"] -= entry["cost"]
+        _catalog_stats["evictions"] += 1
+        if "generation" in entry:
+            # Snapshot-backed: keep the shared body, drop the private parsed copy
+            entry.pop("data", None)
+            entry["cost"] = 0
+        else:
+            del _catalog[relpath]
+
+def catalog_data(entry: Dict[str, Any]) -> Any:
+    """Parsed data for a catalog entry, decoding snapshot-backed bodies on first use"""
+    if "data" not in entry:
+        entry["data"] = json.loads(bytes(entry["body"]))
+        # Rough private memory estimate for the parsed objects
+        entry["cost"] += len(entry["body"])
+        if _catalog.get(entry["path"]) is entry:
+            _catalog_stats["bytes"] += len(entry["body"])
+            _evict_catalog_entries()
+    return entry["data"]
+
+def put_catalog_entry(relpath: str, data: Any, token: Any, modified: float) -> Dict[str, Any]:
+    """Store parsed data and its encoded body for a storage version token"""
+    old = _catalog.pop(relpath, None)
+    if old is not None:
+        _catalog_stats["bytes"] -= old["cost"]
+    
+    entry = build_encoded_entry(encode_json(data), modified)
+    entry.update({
+        "path": relpath,
+        "data": data,
+        "token": token,
+        "checked": time.monotonic(),
+    })
+    _catalog[relpath] = entry
+    _catalog_stats["bytes"] += entry["cost"]
+    if relpath.startswith("categoryvideo/"):
+        index_category_file(relpath, data)
+    _evict_catalog_entries()
+    return entry
+
+def invalidate_catalog_entry(relpath: str):
+    """Forget a cached file so the next lookup reloads it from disk"""
+    entry = _catalog.pop(relpath, None)
+    if entry is not None:
+        _catalog_stats["bytes"] -= entry["cost"]
+
+def load_catalog_entry(relpath: str, revalidate: bool = False) -> Dict[str, Any]:
+    """
+    Return the catalog entry for a file, loading or revalidating it as needed.
+    
+    Entries are revalidated against the storage version token (mtime and
+    size for JSON files) at most once per CATALOG_REVALIDATE_SECONDS, or
+    always with revalidate=True, so writes from other workers are picked up.
+    Raises OSError / json.JSONDecodeError like a plain json.load would.
+    """
+    storage = get_storage()
+    now = time.monotonic()
+    if _snapshot["generation"] is not None and now - _snapshot["checked"] >= CATALOG_REVALIDATE_SECONDS:
+        _snapshot["checked"] = now
+        refresh_catalog_snapshot()
+    
+    entry = _catalog.get(relpath)
+    if entry is not None:
+        if not revalidate and now - entry["checked"] < CATALOG_REVALIDATE_SECONDS:
+            _catalog.move_to_end(relpath)
+            _catalog_stats["hits"] += 1
+            return entry
+        
+        token, modified = storage.stat(relpath)
+        if token == entry["token"]:
+            entry["checked"] = now
+            _catalog.move_to_end(relpath)
+            _catalog_stats["hits"] += 1
+            return entry
+    else:
+        token, modified = storage.stat(relpath)
+    
+    _catalog_stats["misses"] += 1
+    return put_catalog_entry(relpath, storage.read(relpath), token, modified)
+
+def _category_sort_key(relpath: str):
+    """Sort categoryvideo/N.json paths numerically"""
+    stem = Path(relpath).stem
+    return (0, int(stem), "") if stem.isdigit() else (1, 0, stem)
+
+def _unindex_video_urls(relpath: str):
+    for url in _indexed_files.pop(relpath, ()):
+        files = _video_index.get(url)
+        if files is not None:
+            files.pop(relpath, None)
+            if not files:
+                del _video_index[url]
+
+def unindex_category_file(relpath: str):
+    """Remove one category file from the reverse URL and search indexes"""
+    _unindex_video_urls(relpath)
+    search_index_file(relpath, None)
+
+def index_category_file(relpath: str, data: Any, terms: Optional[Dict[str, Dict[str, float]]] = None):
+    """
+    Replace the reverse URL and search index entries for one category file.
+    data: the parsed file, or an iterator over its items (stream-only files);
+    it is walked once. terms: precomputed search terms by video URL (from
+    the snapshot), if any.
+    """
+    _unindex_video_urls(relpath)
+    urls = set()
+    
+    def located(items):
+        for pos, item in enumerate(items):
+            url = item.get("video") if isinstance(item, dict) else None
+            if url:
+                _video_index.setdefault(url, {}).setdefault(relpath, []).append(pos)
+                urls.add(url)
+            yield item
+    
+    items = data if isinstance(data, (list, Iterator)) else ()
+    search_index_file(relpath, located(items), terms)
+    _indexed_files[relpath] = urls
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase, accent-stripped word tokens of a string"""
+    if not isinstance(text, str):
+        return []
+    text = unicodedata.normalize("NFKD", html.unescape(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r"\w+", text.casefold())
+
+def _search_terms(item: Dict[str, Any]) -> Dict[str, float]:
+    """Token -> weight for one item; titles count more than the category"""
+    terms: Dict[str, float] = {}
+    for token in tokenize(item.get("video_text")):
+        terms[token] = terms.get(token, 0.0) + SEARCH_TITLE_WEIGHT
+    for token in tokenize(item.get("category")):
+        terms[token] = terms.get(token, 0.0) + SEARCH_CATEGORY_WEIGHT
+    return terms
+
+def _remove_search_doc(doc_id: int):
+    postings = _search["postings"]
+    for token in _search["docs"][doc_id]["terms"]:
+        docs = postings.get(token)
+        if docs is not None:
+            docs.pop(doc_id, None)
+            if not docs:
+                del postings[token]
+                _search["vocab"] = None
+    _search["docs"][doc_id] = None
+    _search["free"].append(doc_id)
+
+def _search_text_hash(item: Dict[str, Any]) -> int:
+    # Detects edited text on reload without keeping the strings around
+    return hash((item.get("video_text"), item.get("category")))
+
+def _add_search_doc(relpath: str, item: Dict[str, Any], terms: Optional[Dict[str, float]] = None) -> int:
+    if terms is None:
+        terms = _search_terms(item)
+    # Interned tokens are shared with the postings keys; weights live only there
+    tokens = tuple(sys.intern(token) for token in terms)
+    doc = {"file": relpath, "url": item.get("video"), "text": _search_text_hash(item), "terms": tokens}
+    if _search["free"]:
+        doc_id = _search["free"].pop()
+        _search["docs"][doc_id] = doc
+    else:
+        doc_id = len(_search["docs"])
+        _search["docs"].append(doc)
+    
+    postings = _search["postings"]
+    weights = _search["weights"]
+    for token, weight in zip(tokens, terms.values()):
+        docs = postings.get(token)
+        if docs is None:
+            docs = postings[token] = {}
+            _search["vocab"] = None
+        docs[doc_id] = weights.setdefault(weight, weight)
+    return doc_id
+
+def search_index_file(relpath: str, items: Optional[Iterable[Any]], terms: Optional[Dict[str, Dict[str, float]]] = None):
+    """
+    Bring the search index in line with one category file's items (None
+    removes the file).
+    
+    Items already indexed with the same title and category keep their doc;
+    only removed, added or edited items touch the postings. Precomputed
+    terms (by video URL) skip tokenizing.
+    """
+    old = _search["files"].pop(relpath, {})
+    current: Dict[str, int] = {}
+    
+    try:
+        for item in items if items is not None else ():
+            url = item.get("video") if isinstance(item, dict) else None
+            if not url or url in current:
+                continue
+            doc_id = old.pop(url, None)
+            if doc_id is not None:
+                if _search["docs"][doc_id]["text"] == _search_text_hash(item):
+                    current[url] = doc_id
+                    continue
+                _remove_search_doc(doc_id)
+            current[url] = _add_search_doc(relpath, item, terms.get(url) if terms else None)
+    finally:
+        # A streamed file can fail part way; keep what was added removable
+        for doc_id in old.values():
+            _remove_search_doc(doc_id)
+        if current:
+            _search["files"][relpath] = current
+
+def _expand_prefix(prefix: str) -> List[str]:
+    """Indexed tokens starting with prefix (bounded), using the sorted vocabulary"""
+    if _search["vocab"] is None:
+        _search["vocab"] = sorted(_search["postings"])
+    vocab = _search["vocab"]
+    matches = []
+    i = bisect_left(vocab, prefix)
+    while i < len(vocab) and vocab[i].startswith(prefix) and len(matches) < SEARCH_MAX_PREFIX_TERMS:
+        matches.append(vocab[i])
+        i += 1
+    return matches
+
+def search_catalog(query: str) -> List[int]:
+    """
+    Doc ids matching every query token, best first, one per video URL.
+    
+    The last token also matches as a prefix (search-as-you-type). Scores
+    sum idf * field weight per token; prefix matches count a bit less.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    postings = _search["postings"]
+    total_docs = max(len(_search["docs"]) - len(_search["free"]), 1)
+    
+    scores: Optional[Dict[int, float]] = None
+    for i, token in enumerate(tokens):
+        candidates = [(token, 1.0)] if token in postings else []
+        if i == len(tokens) - 1:
+            candidates += [(t, 0.8) for t in _expand_prefix(token) if t != token]
+        
+        matched: Dict[int, float] = {}
+        for term, factor in candidates:
+            docs = postings[term]
+            idf = math.log(1 + total_docs / len(docs))
+            for doc_id, weight in docs.items():
+                if scores is None or doc_id in scores:
+                    score = idf * weight * factor
+                    if score > matched.get(doc_id, 0.0):
+                        matched[doc_id] = score
+        
+        if scores is None:
+            scores = matched
+        else:
+            scores = {doc_id: scores[doc_id] + s for doc_id, s in matched.items()}
+        if not scores:
+            return []
+    
+    if not scores:
+        return []
+    
+    # The same video is listed in several categories; keep its best hit
+    ranked = []
+    seen = set()
+    for doc_id in sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id)):
+        url = _search["docs"][doc_id]["url"]
+        if url not in seen:
+            seen.add(url)
+            ranked.append(doc_id)
+    return ranked
+
+def _find_items(relpath: str, urls: List[str]) -> Dict[str, Any]:
+    """Items of one category file by video URL, located through _video_index"""
+    stream = is_stream_only(relpath)
+    if not stream:
+        # Loading first: a changed file is re-indexed here, before positions are read
+        data = catalog_data(load_catalog_entry(relpath))
+    wanted = {}
+    for url in urls:
+        for pos in _video_index.get(url, {}).get(relpath, ()):
+            wanted[pos] = url
+    
+    if stream:
+        last = max(wanted, default=-1)
+        items = ((pos, item) for pos, item in enumerate(iter_stream_items(relpath)) if pos <= last)
+    else:
+        items = ((pos, data[pos]) for pos in sorted(wanted) if pos < len(data))
+    found = {}
+    for pos, item in items:
+        url = wanted.get(pos)
+        if url is not None and url not in found and isinstance(item, dict) and item.get("video") == url:
+            found[url] = item
+        if stream and pos >= last:
+            break
+    return found
+
+def search_result_items(doc_ids: List[int]) -> List[tuple]:
+    """
+    (relpath, item) for each doc, read from the catalog entries (streamed
+    from disk for stream-only files). Docs are resolved before any file is
+    loaded: a reload re-indexes and may reuse doc ids. Items no longer in
+    their file are skipped.
+    """
+    hits = [(_search["docs"][doc_id]["file"], _search["docs"][doc_id]["url"]) for doc_id in doc_ids]
+    by_file: Dict[str, List[str]] = {}
+    for relpath, url in hits:
+        by_file.setdefault(relpath, []).append(url)
+    
+    found = {}
+    for relpath, urls in by_file.items():
+        try:
+            found[relpath] = _find_items(relpath, urls)
+        except (OSError, UnicodeDecodeError, ValueError):
+            found[relpath] = {}
+    return [(relpath, found[relpath][url]) for relpath, url in hits if url in found[relpath]]
+
+def _index_catalog_file(relpath: str, revalidate: bool = False):
+    try:
+        if is_stream_only(relpath):
+            # Indexed straight from disk; the file never enters the catalog
+            token, _ = get_storage().stat(relpath)
+            if relpath not in _indexed_files or _stream_index_tokens.get(relpath) != token:
+                invalidate_catalog_entry(relpath)
+                _stream_index_tokens.pop(relpath, None)
+                index_category_file(relpath, iter_stream_items(relpath))
+                _stream_index_tokens[relpath] = token
+            return
+        
+        # A changed version token reloads the entry, which re-indexes it
+        entry = load_catalog_entry(relpath, revalidate=revalidate)
+        if relpath not in _indexed_files:
+            # Snapshot-backed entries are indexed without keeping a parsed copy
+            data = entry["data"] if "data" in entry else json.loads(bytes(entry["body"]))
+            terms = marshal.loads(entry["search_terms"]) if "search_terms" in entry else None
+            index_category_file(relpath, data, terms)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        logging.error(f"Video index skipped {relpath}: {str(e)}")
+        unindex_category_file(relpath)
+        _indexed_files[relpath] = set()
+
+def ensure_video_index(revalidate: bool = False) -> List[str]:
+    """
+    Index any category file not loaded into the catalog yet; returns all
+    category paths. With revalidate=True every indexed file is also checked
+    against its storage version token, so files edited outside the app
+    (restore.sh, manual edits) are re-indexed before the index is trusted.
+    """
+    paths = get_storage().list_paths("categoryvideo/")
+    for relpath in paths:
+        if revalidate or relpath not in _indexed_files:
+            _index_catalog_file(relpath, revalidate=revalidate)
+    return paths
+
+def set_reels_cache(data: Dict[str, Any], timestamp: Optional[datetime] = None):
+    """Replace the cached reels data and start a new content version"""
+    _reels_cache["data"] = data
+    _reels_cache["timestamp"] = timestamp or datetime.now()
+    _reels_cache["version"] += 1
+    _reels_pages.clear()
+
+def warm_catalog():
+    """Load every data file from storage into the catalog"""
+    loaded = 0
+    for relpath in get_storage().list_paths():
+        if is_stream_only(relpath):
+            continue
+        try:
+            load_catalog_entry(relpath)
+            loaded += 1
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            logging.error(f"Catalog warm-up skipped {relpath}: {str(e)}")
+    logging.info(f"Catalog warmed with {loaded} files ({_catalog_stats['bytes']} bytes)")
+
+def collect_snapshot_sources() -> List[tuple]:
+    """
+    Revalidate every data file and gather what a snapshot needs from it:
+    (relpath, catalog entry, search terms by URL or None). Touches the
+    catalog and indexes, so it runs on the event loop; the encoding and
+    writing in write_snapshot_file can then run in a thread.
+    """
+    sources = []
+    # Index first so each category can carry its precomputed search terms
+    ensure_video_index()
+    for relpath in get_storage().list_paths():
+        if is_stream_only(relpath):
+            continue
+        try:
+            entry = load_catalog_entry(relpath, revalidate=True)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            logging.error(f"Catalog snapshot skipped {relpath}: {str(e)}")
+            continue
+        
+        terms = None
+        doc_ids = _search["files"].get(relpath)
+        if doc_ids and relpath in _indexed_files:
+            postings = _search["postings"]
+            terms = {
+                url: {token: postings[token][doc_id] for token in _search["docs"][doc_id]["terms"]}
+                for url, doc_id in doc_ids.items()
+            }
+        sources.append((relpath, entry, terms))
+    return sources
+
+def write_snapshot_file(path: str, sources: List[tuple]) -> int:
+    """
+    Encode the collected files (identity, gzip and br bodies) into one
+    snapshot file and atomically replace the previous one. Only reads the
+    entries it is given, so it is safe to run in a thread. Callers hold the
+    catalog-snapshot lock. Returns the number of files written.
+    
+    Layout: magic, 8-byte little-endian header length, JSON header with
+    per-file offsets and validators, then the bodies back to back.
+    """
+    files = {}
+    chunks = []
+    offset = 0
+    for relpath, entry, terms in sources:
+        record = {"token": list(entry["token"]), "modified": entry["modified"], "etag": entry["etag"]}
+        for coding in ("identity", "gzip", "br"):
+            if coding == "identity":
+                body = entry["body"]
+            elif coding in entry["encodings"]:
+                body = entry["encodings"][coding]
+            elif coding == "gzip":
+                body = gzip.compress(entry["body"], compresslevel=6, mtime=0)
+            elif brotli is not None:
+                body = brotli.compress(bytes(entry["body"]), quality=5)
+            else:
+                continue
+            record[coding] = [offset, len(body)]
+            chunks.append(body)
+            offset += len(body)
+        
+        if terms:
+            # marshal: loads far faster than re-tokenizing every title
+            body = marshal.dumps(terms)
+            record["search_terms"] = [offset, len(body)]
+            chunks.append(body)
+            offset += len(body)
+        files[relpath] = record
+    
+    header = json.dumps({
+        "generation": time.time_ns(),
+        "terms_format": SNAPSHOT_TERMS_FORMAT,
+        "files": files,
+    }).encode("utf-8")
+    snapshot_path = Path(path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = snapshot_path.with_suffix(f".tmp.{os.getpid()}")
+    try:
+        with open(temp_file, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        temp_file.replace(snapshot_path)
+    except Exception:
+        if temp_file.exists():
+            temp_file.unlink()
+        raise
+    
+    logging.info(f"Published catalog snapshot with {len(files)} files ({offset} bytes)")
+    return len(files)
+
+def write_catalog_snapshot(path: str = CATALOG_SNAPSHOT) -> int:
+    """Collect and write a snapshot in one blocking call"""
+    return write_snapshot_file(path, collect_snapshot_sources())
+
+def publish_catalog_snapshot(path: str = CATALOG_SNAPSHOT) -> int:
+    """Blocking publish for use outside the event loop (gunicorn master hook)"""
+    lock_path = Path(DATA_DIR) / ".locks" / "catalog-snapshot.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            return write_catalog_snapshot(path)
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def attach_catalog_snapshot(path: str = CATALOG_SNAPSHOT) -> bool:
+    """
+    Map a published snapshot read-only and serve its bodies zero-copy.
+    
+    Entries whose private copy has a different version token are left alone;
+    normal revalidation decides which one is current.
+    """
+    try:
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return False
+    
+    if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        logging.error(f"Ignoring catalog snapshot with bad magic: {path}")
+        return False
+    header_len = int.from_bytes(mapped[8:16], "little")
+    header = json.loads(mapped[16:16 + header_len])
+    view = memoryview(mapped)[16 + header_len:]
+    
+    now = time.monotonic()
+    for relpath, record in header["files"].items():
+        token = tuple(record["token"])
+        current = _catalog.get(relpath)
+        if current is not None and "generation" not in current and current["token"] != token:
+            continue
+        
+        encodings = {}
+        for coding in ("gzip", "br"):
+            if coding in record:
+                start, length = record[coding]
+                encodings[coding] = view[start:start + length]
+        if "search_terms" in record and header.get("terms_format") == SNAPSHOT_TERMS_FORMAT:
+            start, length = record["search_terms"]
+            extra = {"search_terms": view[start:start + length]}
+        else:
+            extra = {}
+        start, length = record["identity"]
+        entry = {
+            **extra,
+            "body": view[start:start + length],
+            "etag": record["etag"],
+            "last_modified": formatdate(record["modified"], usegmt=True),
+            "modified": record["modified"],
+            "encodings": encodings,
+            "cost": 0,
+            "path": relpath,
+            "token": token,
+            "checked": now,
+            "generation": header["generation"],
+        }
+        if current is not None:
+            _catalog_stats["bytes"] -= current["cost"]
+            if current["token"] != token:
+                # Indexed from an older version; ensure_video_index redoes it
+                unindex_category_file(relpath)
+        _catalog[relpath] = entry
+    
+    _snapshot["generation"] = header["generation"]
+    _snapshot["stat"] = (stat.st_ino, stat.st_mtime_ns)
+    _snapshot["checked"] = now
+    return True
+
+def refresh_catalog_snapshot():
+    """Attach a newer snapshot if another process has published one"""
+    try:
+        stat = os.stat(CATALOG_SNAPSHOT)
+    except OSError:
+        return
+    if (stat.st_ino, stat.st_mtime_ns) != _snapshot["stat"]:
+        attach_catalog_snapshot()
+
+async def load_shared_catalog():
+    """Attach the shared snapshot, publishing it first if no process has yet"""
+    if attach_catalog_snapshot():
+        logging.info(f"Worker {os.getpid()} attached catalog snapshot {_snapshot['generation']}")
+        return
+    
+    async with data_file_lock("catalog-snapshot"):
+        # Another worker may have published while we waited for the lock
+        if not attach_catalog_snapshot():
+            warm_catalog()
+            write_catalog_snapshot()
+            attach_catalog_snapshot()
+
+async def _publish_snapshot_later():
+    await asyncio.sleep(SNAPSHOT_PUBLISH_DELAY)
+    try:
+        async with data_file_lock("catalog-snapshot"):
+            # Compressing and fsyncing ~25MB would stall the event loop
+            sources = collect_snapshot_sources()
+            await asyncio.to_thread(write_snapshot_file, CATALOG_SNAPSHOT, sources)
+            attach_catalog_snapshot()
+    except Exception as e:
+        logging.error(f"Catalog snapshot publish failed: {str(e)}")
+
+def schedule_snapshot_publish():
+    """Republish the shared snapshot shortly after local writes (debounced)"""
+    if _snapshot["generation"] is None:
+        return
+    task = _snapshot["publish_task"]
+    if task is None or task.done():
+        _snapshot["publish_task"] = asyncio.create_task(_publish_snapshot_later())
+
+def inc_metric(name: str, labels: tuple = (), value: float = 1):
+    series = _metrics.setdefault(name, {})
+    series[labels] = series.get(labels, 0) + value
+
+def observe_metric(name: str, seconds: float, labels: tuple = ()):
+    """Add an observation to a histogram: per-bucket counts, +Inf count, then the sum"""
+    series = _metrics.setdefault(name, {})
+    histogram = series.get(labels)
+    if histogram is None:
+        histogram = series[labels] = [0] * (len(METRICS_BUCKETS) + 2)
+    histogram[bisect_left(METRICS_BUCKETS, seconds)] += 1
+    histogram[-1] += seconds
+
+class MetricsMiddleware:
+    """Count requests, latency and response bytes per route template"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        state = {"status": 500, "bytes": 0, "recorded": False}
+        
+        def record():
+            state["recorded"] = True
+            # Route templates keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            inc_metric("http_requests_total", (("route", route), ("method", scope["method"]), ("status", str(state["status"]))))
+            observe_metric("http_request_duration_seconds", time.perf_counter() - start, (("route", route),))
+            inc_metric("http_response_bytes_total", (("route", route),), state["bytes"])
+        
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    record()
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not state["recorded"]:
+                record()
+
+app.add_middleware(MetricsMiddleware)
+
+def _worker_metrics() -> Dict[str, Any]:
+    """This worker's counters (absolute totals) and gauges in JSON form"""
+    counters = {
+        name: [[list(labels), value] for labels, value in series.items()]
+        for name, series in _metrics.items()
+    }
+    counters["catalog_cache_requests_total"] = [
+        [[["result", "hit"]], _catalog_stats["hits"]],
+        [[["result", "miss"]], _catalog_stats["misses"]],
+    ]
+    counters["catalog_evictions_total"] = [[[], _catalog_stats["evictions"]]]
+    
+    gauges = {
+        "catalog_bytes": _catalog_stats["bytes"],
+        "catalog_entries": len(_catalog),
+        "reels_pool_items": len(_reels_pool["items"]),
+    }
+    if _reels_cache["timestamp"]:
+        gauges["reels_cache_age_seconds"] = (datetime.now() - _reels_cache["timestamp"]).total_seconds()
+    return {"pid": os.getpid(), "counters": counters, "gauges": gauges}
+
+def dump_worker_metrics():
+    """Atomically write this worker's metrics for /metrics in any worker to merge"""
+    metrics_dir = Path(METRICS_DIR)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=metrics_dir, delete=False, suffix=".tmp") as tmp_file:
+        json.dump(_worker_metrics(), tmp_file)
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, metrics_dir / f"{os.getpid()}.json")
+
+def _merge_counters(totals: Dict[str, Dict[tuple, Any]], counters: Dict[str, List[Any]]):
+    for name, series in counters.items():
+        merged = totals.setdefault(name, {})
+        for labels, value in series:
+            labels = tuple(tuple(pair) for pair in labels)
+            current = merged.get(labels)
+            if current is None:
+                merged[labels] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[labels] = current + value
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def render_metrics(totals: Dict[str, Dict[tuple, Any]], gauges: Dict[str, Dict[tuple, Any]]) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, (kind, help_text) in METRIC_HELP.items():
+        series = (gauges if kind == "gauge" else totals).get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series.items()):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(METRICS_BUCKETS + ("+Inf",), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+async def collect_metrics() -> str:
+    """Merge every worker's dump; fold workers that have exited into retired.json"""
+    dump_worker_metrics()
+    metrics_dir = Path(METRICS_DIR)
+    retired_path = metrics_dir / "retired.json"
+    totals: Dict[str, Dict[tuple, Any]] = {}
+    gauges: Dict[str, Dict[tuple, Any]] = {}
+    
+    async with data_file_lock("metrics"):
+        try:
+            with open(retired_path, "r", encoding="utf-8") as f:
+                retired = json.load(f)
+        except (OSError, ValueError):
+            retired = {"counters": {}}
+        
+        exited = []
+        for path in metrics_dir.glob("*.json"):
+            if path == retired_path:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    dump = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(dump["pid"]):
+                exited.append((path, dump))
+                continue
+            _merge_counters(totals, dump["counters"])
+            for name, value in dump["gauges"].items():
+                gauges.setdefault(name, {})[(("worker", str(dump["pid"])),)] = value
+        
+        if exited:
+            folded: Dict[str, Dict[tuple, Any]] = {}
+            _merge_counters(folded, retired["counters"])
+            for _, dump in exited:
+                _merge_counters(folded, dump["counters"])
+            retired = {"counters": {
+                name: [[list(labels), value] for labels, value in series.items()]
+                for name, series in folded.items()
+            }}
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=metrics_dir, delete=False, suffix=".tmp") as tmp_file:
+                json.dump(retired, tmp_file)
+                tmp_path = tmp_file.name
+            os.replace(tmp_path, retired_path)
+            for path, _ in exited:
+                path.unlink(missing_ok=True)
+    
+    _merge_counters(totals, retired["counters"])
+    return render_metrics(totals, gauges)
+
+def _sample_stacks(thread_id: int, interval: float, deadline: float, counts: Dict[str, int]):
+    """Sample one thread's Python stack until the deadline (collapsed-stack counts)"""
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+        time.sleep(interval)
+
 @app.get("/")
 def health_check():
     return {"status": "healthy", "message": "FastAPI File Server is running"}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness, unlike /: 503 until this worker has its catalog and reels
+    loaded. "indexes" turns true once search / delete indexes are built.
+    """
+    if not _warmup["ready"]:
+        return Response(
+            encode_json({"status": "starting", "worker": os.getpid()}),
+            status_code=503,
+            media_type="application/json",
+        )
+    return {
+        "status": "ready",
+        "worker": os.getpid(),
+        "warmup_ms": round(_warmup["seconds"] * 1000, 1),
+        "indexes": _warmup["indexed"],
+    }
+
 @app.get("/files")
 def list_files(api_key: str = Depends(verify_api_key)):
-    files = []
-    data_path = Path(DATA_DIR)
-    
-    # Recursively find all .json files
-    for json_file in data_path.rglob("*.json"):
-        # Get relative path from data directory
-        relative_path = json_file.relative_to(data_path)
-        files.append(str(relative_path))
+    # Relative paths of every data file in the configured storage backend
+    files = get_storage().list_paths()
     
     return {"files": files}
 
 @app.get("/reels")
 async def get_reels_paginated(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor; empty to start"),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -62,8 +1750,11 @@ async def get_reels_paginated(
     Parameters:
     - page: Page number (default: 1)
     - limit: Items per page (default: 20, max: 100)
+    - cursor: Use cursor mode instead of page numbers. Pass an empty cursor
+      for the first page, then next_cursor from each response. Pages stay
+      consistent across background refreshes.
     
-    Example: /reels?page=1&limit=20
+    Example: /reels?page=1&limit=20 or /reels?cursor=&limit=20
     """
     try:
         # Get reels data from cache or file
@@ -74,17 +1765,28 @@ async def get_reels_paginated(
             cache_age = (datetime.now() - _reels_cache["timestamp"]).total_seconds()
             if cache_age < _reels_cache["ttl"]:
                 reels_data = _reels_cache["data"]
+        inc_metric("reels_cache_requests_total", (("result", "hit" if reels_data else "miss"),))
         
-        # Load from file if not in cache
+        # Reload from file if it changed, otherwise extend the cached copy
         if not reels_data:
-            reels_file = Path(DATA_DIR) / "reelsvideo" / "reels.json"
-            if reels_file.exists():
-                with open(reels_file, "r", encoding="utf-8") as f:
-                    reels_data = json.load(f)
-                    _reels_cache["data"] = reels_data
-                    _reels_cache["timestamp"] = datetime.now()
-            else:
+            sync_reels_pool()
+            reels_data = _reels_cache["data"]
+            if not reels_data:
                 raise HTTPException(status_code=404, detail="Reels data not found")
+            _reels_cache["timestamp"] = datetime.now()
+        
+        if cursor is not None:
+            current = get_cursor_view("reels", reels_content_version(), _build_reels_view)
+            view, offset = resolve_cursor("reels", cursor, current)
+            body = cursor_page_body(view, offset, limit, "reels")
+            return cached_response(
+                request, build_encoded_entry(body, _reels_cache["timestamp"].timestamp())
+            )
+        
+        # Each page is encoded once per reels version
+        page_entry = _reels_pages.get((page, limit))
+        if page_entry is not None:
+            return cached_response(request, page_entry)
         
         # Extract reels array
         all_reels = reels_data.get("reels", [])
@@ -108,7 +1810,7 @@ async def get_reels_paginated(
         paginated_reels = all_reels[start_idx:end_idx]
         
         # Return paginated response with metadata
-        return {
+        body = encode_json({
             "page": page,
             "limit": limit,
             "total_items": total_items,
@@ -116,61 +1818,1035 @@ async def get_reels_paginated(
             "has_next": page < total_pages,
             "has_previous": page > 1,
             "reels": paginated_reels
-        }
+        })
+        page_entry = build_encoded_entry(body, _reels_cache["timestamp"].timestamp())
+        _reels_pages[(page, limit)] = page_entry
+        return cached_response(request, page_entry)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching reels: {str(e)}")
 
-@app.get("/files/{filepath:path}")
-async def get_file(filepath: str, api_key: str = Depends(verify_api_key)):
-    # Enforce .json extension
-    if not filepath.endswith('.json'):
-        raise HTTPException(status_code=400, detail="Only .json files are allowed")
+@app.get("/categories/{category_id}/videos")
+async def get_category_videos(
+    request: Request,
+    category_id: int,
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor; empty to start"),
+    fields: Optional[str] = Query(None, description="Comma separated fields, e.g. thumb,video"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get one category's videos a page at a time instead of the whole file
+    
+    Parameters:
+    - page / limit: Same as /reels
+    - cursor: Cursor mode; pass an empty cursor, then next_cursor
+    - fields: Only return these fields of each video
+    
+    Example: /categories/12/videos?page=1&limit=20&fields=thumb,video
+    """
+    relpath = f"categoryvideo/{category_id}.json"
+    projection = parse_fields(fields)
+    if relpath not in _catalog and is_stream_only(relpath):
+        if cursor is not None:
+            # A cursor view would hold every item of the file
+            raise HTTPException(status_code=413, detail="Category too large for cursor paging; use page and limit")
+        try:
+            body, modified = await asyncio.to_thread(stream_category_page, relpath, page, limit, projection)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON in file")
+        except (OSError, UnicodeDecodeError):
+            raise HTTPException(status_code=404, detail="Category not found")
+        return cached_response(request, build_encoded_entry(body, modified))
+    
+    try:
+        entry = load_catalog_entry(relpath)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in file")
+    except (OSError, UnicodeDecodeError):
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    resource = f"category:{category_id}:{','.join(projection or ())}"
+    
+    def build():
+        videos = catalog_data(entry)
+        if not isinstance(videos, list):
+            raise HTTPException(status_code=404, detail="Category not found")
+        fragments = [encode_json(project_item(v, projection)) for v in videos]
+        keys = [v.get("video", "") if isinstance(v, dict) else "" for v in videos]
+        return fragments, keys
+    
+    # One view per file version and projection; the etag is the same in every worker
+    current = get_cursor_view(resource, entry["etag"], build)
+    if cursor is not None:
+        view, offset = resolve_cursor(resource, cursor, current)
+        body = cursor_page_body(view, offset, limit, "videos", {"category_id": category_id})
+    else:
+        body = offset_page_body(current, page, limit, "videos")
+    return cached_response(request, build_encoded_entry(body, entry["modified"]))
+
+def stream_category_page(relpath: str, page: int, limit: int, projection: Optional[tuple]) -> tuple:
+    """One page of a stream-only category file in a single pass, without caching it; returns (body, modified)"""
+    _, modified = get_storage().stat(relpath)
+    start_idx = (page - 1) * limit
+    fragments = []
+    total_items = 0
+    for item in iter_stream_items(relpath):
+        if start_idx <= total_items < start_idx + limit:
+            fragments.append(encode_json(project_item(item, projection)))
+        total_items += 1
+    return page_body(total_items, page, limit, "videos", fragments), modified
+
+@app.get("/search")
+async def search_videos(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields, e.g. thumb,video"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Search video titles and categories across all category files
+    
+    All words must match; the last word also matches as a prefix.
+    
+    Example: /search?q=amateur+cou&page=1&limit=20
+    """
+    if not tokenize(q):
+        raise HTTPException(status_code=400, detail="Query has no searchable words")
+    
+    ensure_video_index()
+    doc_ids = search_catalog(q)
+    
+    total_items = len(doc_ids)
+    total_pages = (total_items + limit - 1) // limit  # Ceiling division
+    start_idx = (page - 1) * limit
+    projection = parse_fields(fields)
+    
+    results = []
+    for relpath, item in search_result_items(doc_ids[start_idx:start_idx + limit]):
+        result = dict(project_item(item, projection))
+        result["file"] = relpath
+        results.append(result)
+    
+    return {
+        "query": q,
+        "page": page,
+        "limit": limit,
+        "total_items": total_items,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_previous": page > 1,
+        "results": results
+    }
+
+def _viewers(model: Any) -> int:
+    count = model.get("viewersCount") if isinstance(model, dict) else None
+    return count if isinstance(count, int) else 0
+
+def livestream_views(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Precompute live-only / by-viewers orderings and groupShowType buckets"""
+    if _livestream["etag"] != entry["etag"]:
+        data = catalog_data(entry)
+        models = data.get("models", []) if isinstance(data, dict) else []
+        all_idx = list(range(len(models)))
+        by_viewers = sorted(all_idx, key=lambda i: -_viewers(models[i]))
+        is_live = [isinstance(m, dict) and m.get("isLive") is True for m in models]
+        
+        groups: Dict[str, List[int]] = {}
+        for i in all_idx:
+            group = models[i].get("groupShowType") if isinstance(models[i], dict) else None
+            groups.setdefault(group or "", []).append(i)
+        
+        _livestream.update({
+            "etag": entry["etag"],
+            "models": models,
+            "orders": {
+                (False, "none"): all_idx,
+                (False, "viewers"): by_viewers,
+                (True, "none"): [i for i in all_idx if is_live[i]],
+                (True, "viewers"): [i for i in by_viewers if is_live[i]],
+            },
+            "groups": groups,
+            "live": is_live,
+            "pages": {},  # encoded pages for this version
+        })
+    return _livestream
+
+def _load_livestream_entry() -> Dict[str, Any]:
+    try:
+        return load_catalog_entry(LIVESTREAM_PATH)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in file")
+    except (OSError, UnicodeDecodeError):
+        raise HTTPException(status_code=404, detail="Livestream data not found")
+
+@app.get("/livestream")
+async def get_livestream(
+    request: Request,
+    live: bool = Query(False, description="Only models that are live"),
+    sort: str = Query("viewers", pattern="^(viewers|none)$", description="viewers or none"),
+    group: Optional[str] = Query(None, description="Only this groupShowType (empty for none)"),
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    fields: Optional[str] = Query(None, description="Comma separated fields, e.g. username,hlsPlaylist"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get livestream models sorted and filtered on the server
+    
+    Orderings are precomputed when livestream.json changes and pages are
+    cached as encoded bytes until the next change.
+    
+    Example: /livestream?live=true&sort=viewers&page=1&limit=20
+    """
+    entry = _load_livestream_entry()
+    views = livestream_views(entry)
+    projection = parse_fields(fields)
+    
+    key = (live, sort, group, projection, page, limit)
+    page_entry = views["pages"].get(key)
+    if page_entry is None:
+        def build():
+            order = views["orders"][(live, sort)]
+            if group is not None:
+                members = set(views["groups"].get(group, ()))
+                order = [i for i in order if i in members]
+            models = views["models"]
+            fragments = [encode_json(project_item(models[i], projection)) for i in order]
+            keys = [str(models[i].get("username", i)) if isinstance(models[i], dict) else str(i) for i in order]
+            return fragments, keys
+        
+        resource = f"livestream:{live}:{sort}:{group}:{','.join(projection or ())}"
+        view = get_cursor_view(resource, entry["etag"], build)
+        body = offset_page_body(view, page, limit, "models")
+        page_entry = build_encoded_entry(body, entry["modified"])
+        if len(views["pages"]) < 1024:
+            views["pages"][key] = page_entry
+    return cached_response(request, page_entry)
+
+@app.get("/livestream/groups")
+async def get_livestream_groups(api_key: str = Depends(verify_api_key)):
+    """Model counts per groupShowType, total and live"""
+    views = livestream_views(_load_livestream_entry())
+    return {
+        "groups": [
+            {
+                "groupShowType": group,
+                "count": len(members),
+                "live": sum(1 for i in members if views["live"][i]),
+            }
+            for group, members in views["groups"].items()
+        ]
+    }
+
+def _feed_hash(*parts: Any) -> int:
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def feed_permute(index: int, n: int, key: str) -> int:
+    """
+    Element `index` of a keyed pseudo-random permutation of range(n), in
+    O(1): a 4-round Feistel network over the next even bit width, cycle
+    walking until the value falls inside range(n).
+    """
+    if n <= 1:
+        return index
+    half = ((n - 1).bit_length() + 1) // 2
+    mask = (1 << half) - 1
+    x = index
+    while True:
+        left, right = x >> half, x & mask
+        for round_no in range(4):
+            left, right = right, left ^ (_feed_hash(key, round_no, right) & mask)
+        x = (left << half) | right
+        if x < n:
+            return x
+
+def get_feed_table() -> Dict[str, Any]:
+    """
+    Return the item table for the current reels + category versions.
+    
+    Items are de-duplicated by video URL (reels first, then categories in
+    file order); each source owns the id range offsets[i]:offsets[i + 1].
+    Stream-only categories are left out: the table holds every item.
+    """
+    category_paths = sorted(ensure_video_index(), key=_category_sort_key)
+    sync_reels_pool()
+    entries = {}
+    for relpath in category_paths:
+        if is_stream_only(relpath):
+            continue
+        try:
+            entries[relpath] = load_catalog_entry(relpath)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+            continue
+    version = format(_feed_hash(reels_content_version(), *(
+        f"{relpath}={entry['etag']}" for relpath, entry in entries.items()
+    )), "x")
+    
+    table = _feed_tables.pop(version, None)
+    if table is None:
+        reels = (_reels_cache["data"] or {}).get("reels", [])
+        sources = [("reels", reels)]
+        for relpath, entry in entries.items():
+            data = catalog_data(entry)
+            if isinstance(data, list):
+                # Category ids are the file names (categoryvideo/12.json -> "12")
+                sources.append((relpath.rsplit("/", 1)[-1].removesuffix(".json"), data))
+        
+        items = []
+        offsets = [0]
+        seen = set()
+        for _, source_items in sources:
+            for item in source_items:
+                url = item.get("video") if isinstance(item, dict) else None
+                if url and url not in seen:
+                    seen.add(url)
+                    items.append(item)
+            offsets.append(len(items))
+        
+        table = {
+            "version": version,
+            "items": items,
+            "sources": [name for name, _ in sources],
+            "offsets": offsets,
+        }
+        while len(_feed_tables) >= FEED_MAX_TABLES:
+            del _feed_tables[next(iter(_feed_tables))]
+        logging.info(f"Built feed table {version}: {len(items)} unique videos from {len(sources)} sources")
+    _feed_tables[version] = table
+    return table
+
+def parse_feed_weights(weights: Optional[str], sources: List[str]) -> List[float]:
+    """Per-source weights from "reels:3,12:0.5" (source defaults to 1, 0 excludes it)"""
+    result = [1.0] * len(sources)
+    if not weights:
+        return result
+    index = {name: i for i, name in enumerate(sources)}
+    for part in weights.split(","):
+        name, _, value = part.partition(":")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid weight: {part}")
+        if name.strip() not in index or not 0 <= weight < math.inf:
+            raise HTTPException(status_code=400, detail=f"Invalid weight: {part}")
+        result[index[name.strip()]] = weight
+    return result
+
+def feed_page(table: Dict[str, Any], seed: int, weights: List[float], position: int, counts: Dict[int, int], limit: int):
+    """
+    Draw the next `limit` items in O(limit * sources).
+    
+    Each slot picks a source with probability proportional to its weight
+    among sources that still have items, then takes that source's next
+    item in its seeded permutation, so no item repeats. Returns the item
+    ids and the updated counts.
+    """
+    offsets = table["offsets"]
+    sizes = [offsets[i + 1] - offsets[i] for i in range(len(weights))]
+    counts = dict(counts)
+    ids = []
+    for _ in range(limit):
+        live = [(i, w) for i, w in enumerate(weights) if w > 0 and counts.get(i, 0) < sizes[i]]
+        if not live:
+            break
+        target = (_feed_hash(seed, position) / 2 ** 64) * sum(w for _, w in live)
+        source = live[-1][0]
+        for i, w in live:
+            if target < w:
+                source = i
+                break
+            target -= w
+        taken = counts.get(source, 0)
+        ids.append(offsets[source] + feed_permute(taken, sizes[source], f"{seed}:{table['sources'][source]}"))
+        counts[source] = taken + 1
+        position += 1
+    return ids, counts
+
+@app.get("/feed")
+async def get_feed(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    seed: Optional[int] = Query(None, ge=0, description="Shuffle seed; random when omitted"),
+    weights: Optional[str] = Query(None, description="Source weights, e.g. reels:3,12:0.5"),
+    fields: Optional[str] = Query(None, description="Comma separated fields, e.g. thumb,video"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Mixed feed of reels and category videos
+    
+    Sources (reels and each category id) are sampled by weight without
+    repeating a video. The same seed and weights always give the same
+    sequence; seed, weights and position travel in next_cursor.
+    
+    A cursor is tied to the catalog version it was issued for. The worker
+    that built it keeps serving that version, but on any other worker a
+    delete or reels refresh since then ends it with 410: restart from the
+    first page, passing the same seed to keep the order.
+    
+    Example: /feed?limit=20&weights=reels:2 then /feed?cursor=...
+    """
+    if cursor:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            resource, version, seed, weights, position, counts = json.loads(raw)
+            counts = {int(i): int(n) for i, n in counts.items()}
+        except (ValueError, TypeError, AttributeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if (
+            resource != "feed" or not isinstance(version, str) or not isinstance(seed, int)
+            or not isinstance(position, int) or not isinstance(weights, (str, type(None)))
+        ):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        table = _feed_tables.get(version)
+        if table is None:
+            # Versions are content hashes, so another worker's cursor still
+            # matches a table rebuilt here unless the catalog changed since
+            table = get_feed_table()
+            if table["version"] != version:
+                raise HTTPException(status_code=410, detail="Cursor expired, restart from the first page")
+        offsets = table["offsets"]
+        if position < 0 or any(
+            not 0 <= i < len(table["sources"]) or not 0 <= n <= offsets[i + 1] - offsets[i]
+            for i, n in counts.items()
+        ):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        table = get_feed_table()
+        if seed is None:
+            seed = int.from_bytes(os.urandom(4), "little")
+        position = 0
+        counts = {}
+    
+    source_weights = parse_feed_weights(weights, table["sources"])
+    ids, counts = feed_page(table, seed, source_weights, position, counts, limit)
+    position += len(ids)
+    
+    offsets = table["offsets"]
+    total_items = sum(
+        offsets[i + 1] - offsets[i] for i, w in enumerate(source_weights) if w > 0
+    )
+    has_next = position < total_items
+    next_cursor = None
+    if has_next:
+        raw = json.dumps(["feed", table["version"], seed, weights, position, counts], separators=(",", ":"))
+        next_cursor = base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+    
+    projection = parse_fields(fields)
+    head = {
+        "seed": seed,
+        "limit": limit,
+        "total_items": total_items,
+        "has_next": has_next,
+        "next_cursor": next_cursor,
+    }
+    body = splice_items(head, "videos", [encode_json(project_item(table["items"][i], projection)) for i in ids])
+    return cached_response(request, build_encoded_entry(body, time.time()))
+
+@app.get("/changes")
+async def get_changes(
+    since: int = Query(0, ge=0, description="Last version the client has applied"),
+    prefix: Optional[str] = Query(None, description="Only files under this path, e.g. categoryvideo/"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Catalog changes since a version, merged per file
+    
+    Each file maps to the videos added or changed after `since` (full,
+    current items that replace the client's copy) and the video URLs
+    removed. Videos both added and removed after `since` are left out.
+    Apply them and store `version` for the next call. A 410 means the
+    history was compacted past `since`: re-download the files, then
+    continue from the returned `version`.
+    """
+    sync_change_log()
+    version = _changes["version"]
+    if since < _changes["floor"] or since > version:
+        raise HTTPException(
+            status_code=410,
+            detail={"message": "Change history no longer available; resync", "version": version}
+        )
+    
+    merged: Dict[str, Dict[str, Any]] = {}
+    # Versions are contiguous above the floor, so `since` maps to an index
+    for record in _changes["records"][since - _changes["floor"]:]:
+        if prefix and not record["file"].startswith(prefix):
+            continue
+        delta = merged.setdefault(record["file"], {"add": {}, "remove": set(), "fresh": set()})
+        for url in record["remove"]:
+            delta["add"].pop(url, None)
+            if url in delta["fresh"]:
+                # Added and removed since `since`: the client never had it
+                delta["fresh"].discard(url)
+            else:
+                delta["remove"].add(url)
+        # Records from before "update" existed list changed items under "add"
+        legacy = "update" not in record
+        for entry in record["add"]:
+            url = entry.get("video", "") if isinstance(entry, dict) else entry
+            if url in delta["remove"] or legacy:
+                delta["remove"].discard(url)
+            else:
+                delta["fresh"].add(url)
+            delta["add"][url] = True
+        for url in record.get("update", ()):
+            delta["add"][url] = True
+    
+    changes = {}
+    for relpath, delta in merged.items():
+        current = _current_items(relpath, list(delta["add"])) if delta["add"] else {}
+        # A video missing from the file was removed after `version`: the next call reports it
+        add = [current[url] for url in delta["add"] if url in current]
+        if add or delta["remove"]:
+            changes[relpath] = {"add": add, "remove": sorted(delta["remove"])}
+    return {"since": since, "version": version, "changes": changes}
+
+def _current_items(relpath: str, urls: List[str]) -> Dict[str, Any]:
+    """Current items of a changed file by video URL, for /changes"""
+    if relpath == "reelsvideo/reels.json":
+        sync_reels_pool()
+        wanted = set(urls)
+        return {reel["video"]: reel for reel in _reels_pool["items"] if reel.get("video") in wanted}
+    try:
+        if relpath not in _indexed_files:
+            _index_catalog_file(relpath, revalidate=False)
+        return _find_items(relpath, urls)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not read {relpath} for /changes: {e}")
+        return {}
+
+@app.get("/metrics")
+async def get_metrics(api_key: str = Depends(verify_api_key)):
+    """Prometheus metrics summed over all workers (gauges are per worker)"""
+    body = await collect_metrics()
+    return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/debug/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS, description="How long to sample"),
+    interval: float = Query(0.005, ge=0.001, le=1, description="Seconds between samples"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Sample the event loop thread of the worker that receives this request
+    and return collapsed stacks ("frame;frame;frame count" per line, the
+    input format of flamegraph.pl / speedscope). Requires PROFILER_ENABLED=1.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set PROFILER_ENABLED=1)")
+    if _profiler["running"]:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    
+    _profiler["running"] = True
+    counts: Dict[str, int] = {}
+    try:
+        sampler = threading.Thread(
+            target=_sample_stacks,
+            args=(threading.get_ident(), interval, time.monotonic() + seconds, counts),
+            daemon=True,
+        )
+        sampler.start()
+        # The loop keeps serving requests while it is being sampled
+        await asyncio.sleep(seconds)
+        await asyncio.to_thread(sampler.join)
+    finally:
+        _profiler["running"] = False
+    
+    logging.info(f"Profiled worker {os.getpid()} for {seconds}s: {sum(counts.values())} samples")
+    body = "".join(f"{stack} {n}\n" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+    return Response(body, media_type="text/plain", headers={"X-Profile-Worker": str(os.getpid())})
+
+@app.get("/files/{filepath:path}")
+async def get_file(request: Request, filepath: str, api_key: str = Depends(verify_api_key)):
+    file_path = resolve_data_file(filepath)
+    filepath = file_path.relative_to(Path(DATA_DIR).resolve()).as_posix()
+    
+    # reels.json on disk lags the rolling pool between compactions
+    if filepath == "reelsvideo/reels.json":
+        sync_reels_pool()
+        if _reels_cache["data"] is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        entry = _reels_pages.get("file")
+        if entry is None:
+            entry = build_encoded_entry(
+                encode_json(_reels_cache["data"]), _reels_cache["timestamp"].timestamp()
+            )
+            _reels_pages["file"] = entry
+        return cached_response(request, entry)
+    
+    try:
+        if filepath not in _catalog and is_stream_only(filepath):
+            return stream_file_response(request, filepath)
+        entry = load_catalog_entry(filepath)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in file")
+    except (OSError, UnicodeDecodeError):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return cached_response(request, entry)
+
+class BatchResource(BaseModel):
+    path: str  # e.g. "/reels" or "/files/categoryvideo/3.json"
+    params: Dict[str, Any] = {}  # query parameters such as page, limit, cursor, fields
+    etag: Optional[str] = None  # ETag the client holds; 304 with no body if unchanged
+
+class BatchRequest(BaseModel):
+    resources: List[BatchResource]
+
+# Read-only endpoints that may be fetched through /batch
+BATCH_PATH_PREFIXES = ("/reels", "/files/", "/categories/", "/search", "/livestream", "/changes")
+MAX_BATCH_RESOURCES = 20
+
+async def _batch_subrequest(request: Request, resource: BatchResource) -> Dict[str, Any]:
+    """
+    Run one resource through the app in-process and capture status, ETag
+    and the identity-encoded body
+    """
+    url = urlsplit(resource.path)
+    params = {
+        name: ("true" if value else "false") if isinstance(value, bool) else value
+        for name, value in resource.params.items()
+    }
+    query = "&".join(q for q in (url.query, urlencode(params, doseq=True)) if q)
+    
+    headers = [(b"x-api-key", request.headers.get("x-api-key", "").encode("latin-1"))]
+    if resource.etag:
+        headers.append((b"if-none-match", resource.etag.encode("latin-1")))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": request.url.scheme,
+        "path": url.path,
+        "raw_path": url.path.encode("utf-8"),
+        "root_path": "",
+        "query_string": query.encode("utf-8"),
+        "headers": headers,
+        "client": request.client,
+        "server": request.scope.get("server"),
+    }
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    result = {"status": 500, "etag": None, "body": []}
+    
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"etag":
+                    result["etag"] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            result["body"].append(message.get("body", b""))
+    
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # One failing resource must not sink the rest of the batch
+        logging.error(f"Batch resource {resource.path} failed: {str(e)}")
+        return {"status": 500, "etag": None, "body": encode_json({"detail": "Internal server error"})}
+    result["body"] = b"".join(result["body"])
+    return result
+
+def _batch_part(index: int, resource: BatchResource, result: Dict[str, Any]) -> bytes:
+    """One encoded result with the sub-response body spliced in unparsed"""
+    head = encode_json({
+        "index": index,
+        "path": resource.path,
+        "status": result["status"],
+        "etag": result["etag"],
+    })
+    return head[:-1] + b',"body":' + (result["body"] or b"null") + b"}"
+
+@app.post("/batch")
+async def batch_fetch(
+    request: Request,
+    batch: BatchRequest,
+    stream: bool = Query(False, description="Stream results as NDJSON as each one completes"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Fetch several read-only resources in one round trip
+    
+    Request body:
+    {
+        "resources": [
+            {"path": "/reels", "params": {"cursor": "", "limit": 20}},
+            {"path": "/categories/3/videos", "params": {"fields": "thumb,video"}},
+            {"path": "/files/livestream/livestream.json", "etag": "\"...\""}
+        ]
+    }
+    
+    Resources are resolved concurrently. Each result carries its own
+    status, ETag and body, in request order; with ?stream=true every result
+    is written as one NDJSON line as soon as it is ready, tagged by index.
+    """
+    resources = batch.resources
+    if not resources:
+        raise HTTPException(status_code=400, detail="resources cannot be empty")
+    if len(resources) > MAX_BATCH_RESOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_RESOURCES} resources per batch"
+        )
+    for resource in resources:
+        path = urlsplit(resource.path).path
+        if not path.startswith(BATCH_PATH_PREFIXES):
+            raise HTTPException(status_code=400, detail=f"Path not allowed in a batch: {resource.path}")
+    
+    if stream:
+        async def run(index, resource):
+            return index, await _batch_subrequest(request, resource)
+        
+        async def lines():
+            tasks = [asyncio.create_task(run(i, r)) for i, r in enumerate(resources)]
+            try:
+                for done in asyncio.as_completed(tasks):
+                    index, result = await done
+                    yield _batch_part(index, resources[index], result) + b"\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    results = await asyncio.gather(*(_batch_subrequest(request, r) for r in resources))
+    body = b'{"results":[' + b",".join(
+        _batch_part(i, r, result) for i, (r, result) in enumerate(zip(resources, results))
+    ) + b"]}"
+    return cached_response(request, build_encoded_entry(body, time.time()))
+
+class DeleteVideoRequest(BaseModel):
+    video_url: Optional[str] = None
+    video_urls: List[str] = []
+
+# Maximum number of URLs accepted by one DELETE /videos call
+MAX_DELETE_URLS = 1000
+
+@asynccontextmanager
+async def data_file_lock(name: str):
+    """Hold an exclusive flock shared by all workers using this DATA_DIR"""
+    lock_path = Path(DATA_DIR) / ".locks" / f"{name}.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        # Poll without blocking rather than parking a thread per waiter: the
+        # default pool is small, and a holder that needs a second lock (the
+        # change log) must never wait behind its own waiters for a thread
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _changes_path() -> Path:
+    return Path(DATA_DIR) / ".changes" / "changes.log"
+
+def _apply_change_line(line: bytes):
+    record = json.loads(line)
+    if "floor" in record:
+        _changes["floor"] = record["floor"]
+        _changes["version"] = max(_changes["version"], record["floor"])
+        return
+    _changes["records"].append(record)
+    _changes["version"] = record["v"]
+
+def sync_change_log():
+    """
+    Read change records appended since the last sync; a replaced log
+    (compaction by any worker) triggers a full reload.
+    """
+    log_file = _changes_path()
+    try:
+        stat = log_file.stat()
+    except FileNotFoundError:
+        _changes.update(records=[], floor=0, version=0, token=None, offset=0)
+        return
+    
+    if stat.st_ino != _changes["token"] or stat.st_size < _changes["offset"]:
+        _changes.update(records=[], floor=0, version=0, token=stat.st_ino, offset=0)
+    if stat.st_size > _changes["offset"]:
+        with open(log_file, "rb") as f:
+            f.seek(_changes["offset"])
+            chunk = f.read(stat.st_size - _changes["offset"])
+        # Ignore a trailing partial line; it is picked up once complete
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                _apply_change_line(line)
+        _changes["offset"] += end
+
+def _compact_change_log(now: float):
+    """Rewrite the log without records beyond the count, size or age limits"""
+    records = _changes["records"]
+    keep = max(len(records) - CHANGES_MAX_RECORDS // 2, 0) if len(records) > CHANGES_MAX_RECORDS else 0
+    if _changes["offset"] > CHANGES_MAX_BYTES:
+        # Keep the newest records that fit in half the budget
+        start, size = len(records), 0
+        while start > 0:
+            size += len(encode_json(records[start - 1])) + 1
+            if size > CHANGES_MAX_BYTES // 2:
+                break
+            start -= 1
+        keep = max(keep, start)
+    while keep < len(records) and now - records[keep]["ts"] > CHANGES_RETENTION_SECONDS:
+        keep += 1
+    if keep == 0:
+        return
+    
+    floor = records[keep - 1]["v"]
+    log_file = _changes_path()
+    temp_file = log_file.with_suffix(".log.tmp")
+    with open(temp_file, "wb") as f:
+        f.write(encode_json({"floor": floor}) + b"\n")
+        for record in records[keep:]:
+            f.write(encode_json(record) + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    temp_file.replace(log_file)
+    
+    stat = log_file.stat()
+    _changes.update(records=records[keep:], floor=floor, token=stat.st_ino, offset=stat.st_size)
+    logging.info(f"Compacted change log: dropped {keep} records, floor is now version {floor}")
+
+async def record_changes(changes: List[Dict[str, Any]]) -> int:
+    """
+    Append {"file", "add", "update", "remove"} deltas (lists of video URLs)
+    to the change log, each under the next version number. Callers may hold
+    a data file lock; the change-log lock is always taken last. Returns the
+    new version.
+    """
+    changes = [c for c in changes if c.get("add") or c.get("update") or c.get("remove")]
+    if not changes:
+        return _changes["version"]
+    
+    log_file = _changes_path()
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    async with data_file_lock("changes"):
+        sync_change_log()
+        now = time.time()
+        lines = []
+        for change in changes:
+            record = {
+                "v": _changes["version"] + 1,
+                "ts": now,
+                "file": change["file"],
+                "add": change.get("add", []),
+                "update": change.get("update", []),
+                "remove": change.get("remove", []),
+            }
+            _changes["records"].append(record)
+            _changes["version"] = record["v"]
+            lines.append(encode_json(record) + b"\n")
+        
+        with open(log_file, "ab") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        stat = log_file.stat()
+        _changes["token"] = stat.st_ino
+        _changes["offset"] = stat.st_size
+        
+        if (
+            len(_changes["records"]) > CHANGES_MAX_RECORDS
+            or _changes["offset"] > CHANGES_MAX_BYTES
+            or now - _changes["records"][0]["ts"] > CHANGES_RETENTION_SECONDS
+        ):
+            _compact_change_log(now)
+    return _changes["version"]
+
+def _diff_videos(relpath: str, before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Change record for a rewrite of a category file: video URLs that are
+    new ("add"), whose item changed ("update") and that are gone ("remove")
+    """
+    before_items = {v.get('video', ''): v for v in before}
+    add, update = {}, {}
+    for v in after:
+        url = v.get('video', '')
+        if url not in before_items:
+            add[url] = True
+        elif before_items[url] != v:
+            update[url] = True
+    after_urls = {v.get('video', '') for v in after}
+    return {
+        "file": relpath,
+        "add": list(add),
+        "update": list(update),
+        "remove": sorted(set(before_items) - after_urls),
+    }
+
+def _write_category_file(file_path: Path, videos: List[Dict[str, Any]]):
+    """Atomically and durably rewrite a category file in its pretty-printed layout"""
+    # Atomic write using temp file
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        encoding='utf-8',
+        dir=file_path.parent,
+        delete=False,
+        suffix='.tmp'
+    ) as tmp_file:
+        json.dump(videos, tmp_file, indent=2, ensure_ascii=False)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())  # Force write to disk
+        tmp_path = tmp_file.name
     
-    # Prevent directory traversal attacks (allow forward slashes for subdirs)
-    if '..' in filepath or '\\' in filepath:
-        raise HTTPException(status_code=404, detail="File not found")
+    # Replace original file
+    os.replace(tmp_path, file_path)
+
+def _apply_deletes(relpath: str, videos: List[Dict[str, Any]], ops: List[Dict[str, Any]]):
+    """
+    Apply a run of delete ops to one category file in a single filter pass.
     
-    # Special optimized handling for reels.json with caching
-    if filepath == "reelsvideo/reels.json":
-        # Check cache first
-        if _reels_cache["data"] and _reels_cache["timestamp"]:
-            cache_age = (datetime.now() - _reels_cache["timestamp"]).total_seconds()
-            if cache_age < _reels_cache["ttl"]:
-                return _reels_cache["data"]
+    Uses the reverse index positions when they still match the file and
+    falls back to a scan otherwise. Each op gets its removed counts per URL;
+    a URL requested by several ops is credited to the first one.
+    """
+    urls = set()
+    for op in ops:
+        urls.update(op["urls"])
     
-    # Construct and validate the file path
-    data_path = Path(DATA_DIR).resolve()
-    file_path = (data_path / filepath).resolve()
+    drop = set()
+    for url in urls:
+        drop.update(_video_index.get(url, {}).get(relpath, ()))
+    if not all(
+        pos < len(videos) and videos[pos].get('video', '') in urls for pos in drop
+    ):
+        # Index is stale for this file (changed by another worker); filter instead
+        inc_metric("delete_index_fallback_scans_total")
+        drop = {pos for pos, v in enumerate(videos) if v.get('video', '') in urls}
     
-    # Ensure the resolved path is within the data directory
-    if not file_path.is_relative_to(data_path):
-        raise HTTPException(status_code=404, detail="File not found")
+    removed = {}
+    for pos in drop:
+        url = videos[pos].get('video', '')
+        removed[url] = removed.get(url, 0) + 1
     
-    # Check if file exists
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    results = []
+    for op in ops:
+        results.append({url: removed.pop(url) for url in op["urls"] if url in removed})
     
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-        # Cache reels.json for performance
-        if filepath == "reelsvideo/reels.json":
-            _reels_cache["data"] = data
-            _reels_cache["timestamp"] = datetime.now()
-            
-        return data
+    if drop:
+        videos = [v for pos, v in enumerate(videos) if pos not in drop]
+    return videos, results
+
+def _apply_dead_marks(relpath: str, videos: List[Dict[str, Any]], ops: List[Dict[str, Any]]):
+    """Flag videos whose URLs were found dead with "dead": true instead of removing them"""
+    urls = set()
+    for op in ops:
+        urls.update(op["urls"])
+    
+    marked = {}
+    result_videos = []
+    for video in videos:
+        url = video.get('video', '')
+        if url in urls and not video.get('dead'):
+            # Copy: the old list may still back cached views
+            video = {**video, "dead": True}
+            marked[url] = marked.get(url, 0) + 1
+        result_videos.append(video)
+    
+    results = []
+    for op in ops:
+        results.append({url: marked.pop(url) for url in op["urls"] if url in marked})
+    return (result_videos if any(results) else videos), results
+
+# Mutation kind -> batch applier(relpath, videos, ops) -> (videos, per-op results)
+_MUTATION_APPLIERS = {
+    "delete": _apply_deletes,
+    "mark_dead": _apply_dead_marks,
+}
+
+async def _apply_file_mutations(relpath: str, queued: List[Any]):
+    """Apply all queued ops for one file and write it once, under its lock"""
+    storage = get_storage()
+    
+    async with data_file_lock(relpath.replace("/", "_")):
+        # Re-read under the lock so updates from other workers are not lost
+        stream = is_stream_only(relpath)
+        if stream:
+            # Too large for the catalog: parse a private copy for this batch only
+            videos = storage.read(relpath)
+        else:
+            videos = catalog_data(load_catalog_entry(relpath, revalidate=True))
+        if not isinstance(videos, list):
+            raise ValueError(f"{relpath} is not a list of videos")
         
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON in file")
-    except (OSError, UnicodeDecodeError):
-        raise HTTPException(status_code=404, detail="File not found")
+        original = videos
+        ops = [op for op, _ in queued]
+        results = []
+        i = 0
+        while i < len(ops):
+            # Hand consecutive ops of the same kind to their applier together
+            j = i
+            while j < len(ops) and ops[j]["op"] == ops[i]["op"]:
+                j += 1
+            videos, batch_results = _MUTATION_APPLIERS[ops[i]["op"]](relpath, videos, ops[i:j])
+            results.extend(batch_results)
+            i = j
+        
+        if any(results):
+            storage.write(relpath, videos)
+            if stream:
+                index_category_file(relpath, videos)
+                _stream_index_tokens[relpath] = storage.stat(relpath)[0]
+            else:
+                put_catalog_entry(relpath, videos, *storage.stat(relpath))
+            await record_changes([_diff_videos(relpath, original, videos)])
+            schedule_snapshot_publish()
+    
+    return results
 
-class DeleteVideoRequest(BaseModel):
-    video_url: str
+async def _flush_mutations():
+    """Wait for the batch window, then apply every pending op file by file"""
+    await asyncio.sleep(MUTATION_BATCH_WINDOW)
+    pending = _mutation_queue["pending"]
+    _mutation_queue["pending"] = {}
+    _mutation_queue["task"] = None
+    
+    for relpath, queued in pending.items():
+        try:
+            results = await _apply_file_mutations(relpath, queued)
+        except Exception as e:
+            for _, future in queued:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, future), result in zip(queued, results):
+            if not future.done():
+                future.set_result(result)
+
+async def submit_mutations(ops: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Queue one op per category file and wait until the batch holding them is
+    durable. Returns {relpath: result or exception}.
+    """
+    loop = asyncio.get_running_loop()
+    futures = {}
+    for relpath, op in ops.items():
+        future = loop.create_future()
+        _mutation_queue["pending"].setdefault(relpath, []).append((op, future))
+        futures[relpath] = future
+    
+    if futures and _mutation_queue["task"] is None:
+        _mutation_queue["task"] = asyncio.create_task(_flush_mutations())
+    
+    results = await asyncio.gather(*futures.values(), return_exceptions=True)
+    return dict(zip(futures, results))
 
 @app.delete("/videos")
 async def delete_video(
@@ -178,103 +2854,200 @@ async def delete_video(
     api_key: str = Depends(verify_api_key)
 ):
     """
-    Delete a video from all categoryvideo files by embed URL
+    Delete videos from all categoryvideo files by embed URL
     
-    Request body:
+    Request body (single URL or many at once):
     {
-        "video_url": "https://xhaccess.com/embed/xhABC123"
+        "video_url": "https://xhaccess.com/embed/xhABC123",
+        "video_urls": ["https://xhaccess.com/embed/xhDEF456"]
     }
     
+    Only the files listed in the reverse URL index for these URLs are read
+    and rewritten, batched with other deletes arriving in the same window.
     Returns count of deleted videos and files modified
     """
-    video_url = request.video_url.strip()
+    video_urls = [u.strip() for u in request.video_urls]
+    if request.video_url is not None:
+        video_urls.insert(0, request.video_url.strip())
     
-    if not video_url:
+    if not video_urls or not all(video_urls):
         raise HTTPException(status_code=400, detail="video_url cannot be empty")
     
+    if len(video_urls) > MAX_DELETE_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_DELETE_URLS} video URLs per request"
+        )
+    
     # Validate URL format
-    if not video_url.startswith("http"):
+    if not all(u.startswith("http") for u in video_urls):
         raise HTTPException(status_code=400, detail="video_url must be a valid URL")
     
-    category_dir = Path(DATA_DIR) / "categoryvideo"
-    
-    if not category_dir.exists():
+    # A stale index would report not_found for videos that are still there
+    if not ensure_video_index(revalidate=True):
         raise HTTPException(status_code=404, detail="Category directory not found")
     
+    urls = set(video_urls)
+    
+    # Group the requested URLs by the files that contain them
+    candidates: Dict[str, set] = {}
+    for url in urls:
+        for relpath in _video_index.get(url, {}):
+            candidates.setdefault(relpath, set()).add(url)
+    
+    # Coalesced with concurrent deletes and applied once per file
+    results = await submit_mutations({
+        relpath: {"op": "delete", "urls": file_urls}
+        for relpath, file_urls in candidates.items()
+    })
+    
     deleted_count = 0
+    deleted_per_url: Dict[str, int] = {}
     files_modified = []
     
-    # Search through all category files (0.json to 54.json)
-    for i in range(0, 55):
-        file_path = category_dir / f"{i}.json"
-        
-        if not file_path.exists():
+    for relpath in sorted(results, key=_category_sort_key):
+        removed = results[relpath]
+        if isinstance(removed, Exception):
+            logging.error(f"Error processing {relpath}: {str(removed)}")
             continue
         
-        try:
-            # Read current file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                videos = json.load(f)
+        if removed:
+            count = sum(removed.values())
+            deleted_count += count
+            for url, n in removed.items():
+                deleted_per_url[url] = deleted_per_url.get(url, 0) + n
+            file_name = relpath.split("/", 1)[1]
+            files_modified.append({
+                "file": file_name,
+                "deleted": count
+            })
             
-            if not isinstance(videos, list):
-                continue
-            
-            # Filter out videos matching the URL
-            original_count = len(videos)
-            filtered_videos = [v for v in videos if v.get('video', '') != video_url]
-            new_count = len(filtered_videos)
-            
-            # If videos were removed, write atomically
-            if new_count < original_count:
-                # Atomic write using temp file
-                with tempfile.NamedTemporaryFile(
-                    mode='w',
-                    encoding='utf-8',
-                    dir=category_dir,
-                    delete=False,
-                    suffix='.tmp'
-                ) as tmp_file:
-                    json.dump(filtered_videos, tmp_file, indent=2, ensure_ascii=False)
-                    tmp_path = tmp_file.name
-                
-                # Replace original file
-                os.replace(tmp_path, file_path)
-                
-                removed = original_count - new_count
-                deleted_count += removed
-                files_modified.append({
-                    "file": f"{i}.json",
-                    "deleted": removed
-                })
-                
-                logging.info(f"Deleted {removed} video(s) from {i}.json matching URL: {video_url}")
-        
-        except Exception as e:
-            logging.error(f"Error processing {i}.json: {str(e)}")
-            continue
+            logging.info(f"Deleted {count} video(s) from {file_name} matching {len(removed)} URL(s)")
+    
+    inc_metric("delete_requests_total")
+    inc_metric("delete_files_scanned_total", value=len(candidates))
+    inc_metric("delete_files_rewritten_total", value=len(files_modified))
+    inc_metric("delete_videos_removed_total", value=deleted_count)
+    
+    response = {
+        "video_url": video_urls[0],
+        "deleted_count": deleted_count,
+        "files_checked": len(candidates)
+    }
+    if len(video_urls) > 1:
+        response["video_urls"] = video_urls
+        response["not_found"] = [u for u in video_urls if u not in deleted_per_url]
     
     if deleted_count == 0:
         return {
             "status": "not_found",
             "message": "Video not found in any category files",
-            "video_url": video_url,
-            "deleted_count": 0,
-            "files_checked": 55
+            **response
         }
     
     return {
         "status": "success",
         "message": f"Deleted {deleted_count} video(s) from {len(files_modified)} file(s)",
-        "video_url": video_url,
-        "deleted_count": deleted_count,
-        "files_modified": files_modified,
-        "files_checked": 55
+        **response,
+        "files_modified": files_modified
     }
 
-async def fetch_fresh_reels_data() -> List[Dict[str, Any]]:
-    """Fetch fresh video data from tik.porn API and transform to our format"""
-    api_url = "https://apiv2.tik.porn/getnextvideos"
-    payload = {"amount": 100}
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the worker's long-lived upstream client (keep-alive pool, optional
+    HTTP/2), creating it on first use in the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_client["client"]
+    if client is None or _http_client["loop"] is not loop:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+            http2=UPSTREAM_HTTP2 and importlib.util.find_spec("h2") is not None,
+        )
+        _http_client["client"] = client
+        _http_client["loop"] = loop
+    return client
+
+async def close_http_client():
+    client = _http_client["client"]
+    _http_client["client"] = None
+    _http_client["loop"] = None
+    if client is not None:
+        await client.aclose()
+
+async def _post_upstream(url: str, payload: Dict[str, Any]) -> httpx.Response:
+    """POST upstream, hedging with a second request if the first is slow"""
+    client = get_http_client()
+    first = asyncio.create_task(client.post(url, json=payload))
+    if UPSTREAM_HEDGE_AFTER <= 0:
+        return await first
+    
+    done, _ = await asyncio.wait({first}, timeout=UPSTREAM_HEDGE_AFTER)
+    if done:
+        return first.result()
+    
+    # First attempt is past the latency threshold: race a hedged copy
+    inc_metric("upstream_hedged_requests_total")
+    pending = {first, asyncio.create_task(client.post(url, json=payload))}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+    
+    # Both failed; surface the first attempt's error
+    return first.result()
+
+def transform_reels(api_data: Any) -> List[Dict[str, Any]]:
+    """Transform a getnextvideos API response to our reels format"""
+    transformed_reels = []
+    
+    # Check if response has the expected structure
+    if isinstance(api_data, dict) and api_data.get("code") == 200 and "data" in api_data:
+        videos = api_data["data"]
+        
+        for video in videos:
+            try:
+                # Use actual URLs from API response
+                mp4_url = video.get("mp4_url", "")
+                medium_thumb = video.get("medium_thumb", "")
+                
+                # Get title from video_text field
+                video_text_data = video.get("video_text", {})
+                title = ""
+                if isinstance(video_text_data, dict):
+                    display_title = video_text_data.get("display_video_title", {})
+                    if isinstance(display_title, dict):
+                        default_title = display_title.get("default", {})
+                        if isinstance(default_title, dict):
+                            title = default_title.get("text", "")
+                
+                # Fallback to action name if no title
+                if not title:
+                    action_name = video.get("action_name", "")
+                    title = f"{action_name} | Tik.Porn" if action_name else "Video | Tik.Porn"
+                
+                # Only add videos with valid URLs
+                if mp4_url and medium_thumb:
+                    reel = {
+                        "thumb": medium_thumb,
+                        "video": mp4_url,
+                        "video_text": title
+                    }
+                    transformed_reels.append(reel)
+                    
+            except Exception as e:
+                # Skip invalid video entries
+                continue
+    
+    return transformed_reels
+
+async def fetch_reels_batch(amount: int = REELS_FETCH_AMOUNT) -> List[Dict[str, Any]]:
+    """Fetch one batch of videos from the reels API, with retries and backoff"""
+    payload = {"amount": amount}
     
     # Retry configuration
     max_retries = 3
@@ -282,65 +3055,21 @@ async def fetch_fresh_reels_data() -> List[Dict[str, Any]]:
     
     for attempt in range(max_retries):
         try:
-            timeout_config = httpx.Timeout(30.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout_config) as client:
-                response = await client.post(api_url, json=payload)
-                response.raise_for_status()
-                
-                api_data = response.json()
-                
-                # Transform API response to our reels format
-                transformed_reels = []
-                
-                # Check if response has the expected structure
-                if isinstance(api_data, dict) and api_data.get("code") == 200 and "data" in api_data:
-                    videos = api_data["data"]
-                    
-                    for video in videos:
-                        try:
-                            # Use actual URLs from API response
-                            mp4_url = video.get("mp4_url", "")
-                            medium_thumb = video.get("medium_thumb", "")
-                            
-                            # Get title from video_text field
-                            video_text_data = video.get("video_text", {})
-                            title = ""
-                            if isinstance(video_text_data, dict):
-                                display_title = video_text_data.get("display_video_title", {})
-                                if isinstance(display_title, dict):
-                                    default_title = display_title.get("default", {})
-                                    if isinstance(default_title, dict):
-                                        title = default_title.get("text", "")
-                            
-                            # Fallback to action name if no title
-                            if not title:
-                                action_name = video.get("action_name", "")
-                                title = f"{action_name} | Tik.Porn" if action_name else "Video | Tik.Porn"
-                            
-                            # Only add videos with valid URLs
-                            if mp4_url and medium_thumb:
-                                reel = {
-                                    "thumb": medium_thumb,
-                                    "video": mp4_url,
-                                    "video_text": title
-                                }
-                                transformed_reels.append(reel)
-                                
-                        except Exception as e:
-                            # Skip invalid video entries
-                            continue
-                
-                return transformed_reels
+            response = await _post_upstream(REELS_API_URL, payload)
+            response.raise_for_status()
+            return transform_reels(response.json())
                 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:  # Rate limited
                 if attempt < max_retries - 1:
+                    inc_metric("upstream_retries_total", (("reason", "rate_limited"),))
                     delay = base_delay * (2 ** attempt)  # Exponential backoff
                     await asyncio.sleep(delay)
                     continue
             raise HTTPException(status_code=502, detail=f"External API error: {e.response.status_code}")
         except httpx.RequestError:
             if attempt < max_retries - 1:
+                inc_metric("upstream_retries_total", (("reason", "connection"),))
                 delay = base_delay * (2 ** attempt)
                 await asyncio.sleep(delay)
                 continue
@@ -351,6 +3080,40 @@ async def fetch_fresh_reels_data() -> List[Dict[str, Any]]:
     # If all retries failed
     raise HTTPException(status_code=502, detail="External API request failed after retries")
 
+async def fetch_fresh_reels_data() -> List[Dict[str, Any]]:
+    """
+    Fetch fresh video data from tik.porn API and transform to our format.
+    
+    REELS_FETCH_BATCHES requests of REELS_FETCH_AMOUNT videos are issued
+    concurrently over the pooled client and merged, dropping repeated
+    video URLs. Fails only if every batch fails.
+    """
+    start = time.perf_counter()
+    batches = await asyncio.gather(
+        *[fetch_reels_batch() for _ in range(REELS_FETCH_BATCHES)],
+        return_exceptions=True
+    )
+    observe_metric("reels_refresh_duration_seconds", time.perf_counter() - start)
+    
+    merged = []
+    seen = set()
+    errors = []
+    for batch in batches:
+        if isinstance(batch, BaseException):
+            errors.append(batch)
+            continue
+        for reel in batch:
+            if reel["video"] not in seen:
+                seen.add(reel["video"])
+                merged.append(reel)
+    
+    inc_metric("reels_refresh_total", (("result", "success" if merged else "failure"),))
+    if errors:
+        logging.warning(f"{len(errors)} of {len(batches)} reels batches failed: {errors[0]}")
+        if not merged:
+            raise errors[0]
+    return merged
+
 async def write_reels_atomically(data: Dict[str, Any], file_path: Path):
     """Write reels data atomically to prevent corruption"""
     # Write to temporary file first
@@ -358,12 +3121,14 @@ async def write_reels_atomically(data: Dict[str, Any], file_path: Path):
     
     try:
         with open(temp_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
             f.flush()
             os.fsync(f.fileno())  # Force write to disk
         
         # Atomic move to final location
         temp_file.replace(file_path)
+        invalidate_catalog_entry(file_path.relative_to(DATA_DIR).as_posix())
+        schedule_snapshot_publish()
         
     except Exception:
         # Clean up temp file on error
@@ -371,38 +3136,516 @@ async def write_reels_atomically(data: Dict[str, Any], file_path: Path):
             temp_file.unlink()
         raise
 
-@app.post("/refresh-reels")
-async def refresh_reels_data(api_key: str = Depends(verify_api_key)):
-    """Fetch fresh reels data and update reels.json file"""
+def _reels_paths():
+    """Compacted reels.json and the append-only change log next to it"""
+    reels_dir = Path(DATA_DIR) / "reelsvideo"
+    return reels_dir / "reels.json", reels_dir / "reels.log"
+
+def _apply_reels_record(record: Dict[str, Any]):
+    """Apply one reels log record to the in-memory pool (evictions, then additions)"""
+    added = _reels_pool["added"]
+    if "base" in record:
+        # Written by compaction: when each item of the new reels.json was added
+        added.update(record["base"])
+        return
+    
+    evict = set(record.get("evict", ()))
+    if evict:
+        _reels_pool["items"] = [r for r in _reels_pool["items"] if r["video"] not in evict]
+        for video in evict:
+            added.pop(video, None)
+    for reel in record.get("add", ()):
+        if reel["video"] not in added:
+            _reels_pool["items"].append(reel)
+            added[reel["video"]] = record["ts"]
+
+def sync_reels_pool() -> bool:
+    """
+    Bring the in-memory reels pool up to date with reels.json + reels.log.
+    
+    Only log lines appended since the last sync are read; a new reels.json
+    (compaction) or a truncated log triggers a full reload. This is how
+    workers that are not the refresh leader pick up new data.
+    Returns True when the cached reels changed.
+    """
+    base_file, log_file = _reels_paths()
+    try:
+        stat = base_file.stat()
+        base_token = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stat = None
+        base_token = None
+    try:
+        log_size = log_file.stat().st_size
+    except FileNotFoundError:
+        log_size = 0
+    
+    changed = False
+    if base_token != _reels_pool["base_token"] or log_size < _reels_pool["log_offset"]:
+        items = []
+        if stat is not None:
+            with open(base_file, "r", encoding="utf-8") as f:
+                items = json.load(f).get("reels", [])
+        _reels_pool["items"] = items
+        _reels_pool["added"] = {r["video"]: stat.st_mtime for r in items}
+        _reels_pool["base_token"] = base_token
+        _reels_pool["log_offset"] = 0
+        changed = True
+    
+    if log_size > _reels_pool["log_offset"]:
+        with open(log_file, "rb") as f:
+            f.seek(_reels_pool["log_offset"])
+            chunk = f.read(log_size - _reels_pool["log_offset"])
+        # Ignore a trailing partial line; it is picked up once complete
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                _apply_reels_record(json.loads(line))
+        _reels_pool["log_offset"] += end
+        changed = changed or end > 0
+    
+    if changed:
+        set_reels_cache({"reels": list(_reels_pool["items"])})
+    return changed
+
+async def _compact_reels_log():
+    """Rewrite reels.json from the pool and restart the log with item ages"""
+    base_file, log_file = _reels_paths()
+    
+    # reels.json first: replaying the old log over the new base is harmless
+    await write_reels_atomically({"reels": _reels_pool["items"]}, base_file)
+    
+    base_record = {"ts": time.time(), "base": _reels_pool["added"]}
+    temp_file = log_file.with_suffix(".log.tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(base_record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    temp_file.replace(log_file)
+    
+    stat = base_file.stat()
+    _reels_pool["base_token"] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    _reels_pool["log_offset"] = log_file.stat().st_size
+    _reels_pool["compacted_size"] = _reels_pool["log_offset"]
+    logging.info(f"Compacted reels log: {len(_reels_pool['items'])} videos in reels.json")
+
+async def save_reels(fresh_reels: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Merge freshly fetched reels into the rolling pool.
+    
+    New videos (by URL) are appended; videos older than REELS_MAX_AGE and
+    the oldest ones beyond REELS_POOL_MAX are evicted. The change is
+    appended to reels.log, and reels.json is rewritten only when the log
+    has grown by REELS_COMPACT_BYTES since the last compaction.
+    """
+    base_file, _ = _reels_paths()
+    
+    # Create directory if it doesn't exist
+    base_file.parent.mkdir(parents=True, exist_ok=True)
+    
+    # The lock keeps workers from interleaving log appends and compactions
+    async with data_file_lock("reels"):
+        sync_reels_pool()
+        now = time.time()
+        added = _reels_pool["added"]
+        
+        new_reels = []
+        seen = set()
+        for reel in fresh_reels:
+            if reel["video"] not in added and reel["video"] not in seen:
+                seen.add(reel["video"])
+                new_reels.append(reel)
+        new_reels = new_reels[-REELS_POOL_MAX:]
+        
+        items = _reels_pool["items"]
+        evict = [r["video"] for r in items if now - added.get(r["video"], now) > REELS_MAX_AGE]
+        overflow = len(items) - len(evict) + len(new_reels) - REELS_POOL_MAX
+        if overflow > 0:
+            expired = set(evict)
+            evict.extend([r["video"] for r in items if r["video"] not in expired][:overflow])
+        
+        if new_reels or evict:
+            await _append_reels_record({"ts": now, "evict": evict, "add": new_reels})
+    
+    return {"added": len(new_reels), "evicted": len(evict), "total": len(_reels_pool["items"])}
+
+async def _append_reels_record(record: Dict[str, Any]):
+    """Durably append a record to reels.log and apply it; callers hold the reels lock"""
+    base_file, log_file = _reels_paths()
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(log_file, "ab") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+    _apply_reels_record(record)
+    _reels_pool["log_offset"] += len(line)
+    
+    log_growth = _reels_pool["log_offset"] - _reels_pool["compacted_size"]
+    if log_growth > REELS_COMPACT_BYTES or not base_file.exists():
+        await _compact_reels_log()
+    set_reels_cache({"reels": list(_reels_pool["items"])})
+    await record_changes([{
+        "file": "reelsvideo/reels.json",
+        "add": [reel.get("video", "") for reel in record["add"]],
+        "remove": record["evict"],
+    }])
+
+async def evict_reels(urls: set) -> int:
+    """Remove these video URLs from the reels pool; returns how many were evicted"""
+    base_file, _ = _reels_paths()
+    base_file.parent.mkdir(parents=True, exist_ok=True)
+    async with data_file_lock("reels"):
+        sync_reels_pool()
+        evict = [r["video"] for r in _reels_pool["items"] if r["video"] in urls]
+        if evict:
+            await _append_reels_record({"ts": time.time(), "evict": evict, "add": []})
+    return len(evict)
+
+def reels_file_age() -> Optional[float]:
+    """Seconds since reels.json or reels.log was last written, or None if neither exists"""
+    mtimes = []
+    for path in _reels_paths():
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except FileNotFoundError:
+            pass
+    return time.time() - max(mtimes) if mtimes else None
+
+def _refresh_state_path() -> Path:
+    return Path(DATA_DIR) / ".locks" / "reels-refresh.json"
+
+def read_refresh_state() -> Dict[str, Any]:
+    """When the reels refresh last ran and is next due (shared by all workers)"""
+    try:
+        with open(_refresh_state_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def record_refresh_attempt(succeeded: bool):
+    """
+    Schedule the next upstream refresh: REELS_REFRESH_SECONDS after a
+    success, doubling after each consecutive failure up to
+    REELS_REFRESH_MAX_BACKOFF so an outage is not polled harder.
+    """
+    now = time.time()
+    failures = 0 if succeeded else read_refresh_state().get("failures", 0) + 1
+    delay = min(REELS_REFRESH_SECONDS * 2 ** max(failures - 1, 0), max(REELS_REFRESH_MAX_BACKOFF, REELS_REFRESH_SECONDS))
+    
+    state_path = _refresh_state_path()
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = state_path.with_suffix(f".tmp.{os.getpid()}")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump({"attempted": now, "next_attempt": now + delay, "failures": failures}, f)
+    temp_file.replace(state_path)
+    if failures:
+        logging.warning(f"Reels refresh failed {failures} time(s) in a row; next attempt in {delay:.0f}s")
+
+def reels_refresh_due() -> bool:
+    """
+    Whether the leader should fetch upstream now. Gated on the recorded
+    attempt rather than file mtimes: a refresh that brings nothing new
+    writes no data, and must not make the next tick refetch.
+    """
+    state = read_refresh_state()
+    if "next_attempt" in state:
+        return time.time() >= state["next_attempt"]
+    age = reels_file_age()
+    return age is None or age >= REELS_REFRESH_SECONDS
+
+def try_become_reels_leader() -> bool:
+    """
+    Try to take the reels refresh lease (a non-blocking flock under DATA_DIR).
+    
+    The lock file stays open for the life of the process, so the kernel
+    releases the lease when the leader exits or is recycled by gunicorn.
+    """
+    if _leader["lock_file"] is not None:
+        return True
+    
+    lock_path = Path(DATA_DIR) / ".locks" / "reels-refresh.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(lock_path, "a")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    
+    _leader["lock_file"] = lock_file
+    logging.info(f"Worker {os.getpid()} is now the reels refresh leader")
+    return True
+
+def release_reels_leadership():
+    """Give up the reels refresh lease so another worker can take over"""
+    lock_file = _leader["lock_file"]
+    if lock_file is not None:
+        _leader["lock_file"] = None
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        lock_file.close()
+
+def _load_link_results() -> Dict[str, List[Any]]:
+    """Link check results shared across restarts (data/.cache/links.json)"""
+    if _link_check["results"] is None:
+        try:
+            with open(LINK_CHECK_CACHE, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            _link_check["results"] = saved.get("urls", {})
+            _link_check["last_pass"] = saved.get("last_pass", 0.0)
+        except (OSError, ValueError):
+            _link_check["results"] = {}
+    return _link_check["results"]
+
+def _save_link_results(last_pass: float):
+    path = Path(LINK_CHECK_CACHE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as tmp_file:
+        json.dump({"last_pass": last_pass, "urls": _link_check["results"]}, tmp_file)
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, path)
+    _link_check["last_pass"] = last_pass
+
+async def check_url(url: str, hosts: Dict[str, Dict[str, Any]]) -> Optional[bool]:
+    """
+    HEAD a URL (GET of one byte if HEAD is not allowed). Returns False for a
+    dead status, True for a success and None when the result is unknown
+    (timeouts, 5xx, rate limiting) so it is retried next pass.
+    """
     try:
-        # Fetch fresh data from external API
-        fresh_reels = await fetch_fresh_reels_data()
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return None
+    slot = hosts.get(host)
+    if slot is None:
+        slot = hosts[host] = {"sem": asyncio.Semaphore(LINK_CHECK_PER_HOST), "next": 0.0}
+    
+    client = get_http_client()
+    async with slot["sem"]:
+        # Space request starts to one host at LINK_CHECK_HOST_RPS
+        now = time.monotonic()
+        start = max(now, slot["next"])
+        slot["next"] = start + 1 / LINK_CHECK_HOST_RPS
+        if start > now:
+            await asyncio.sleep(start - now)
+        try:
+            response = await client.head(url, follow_redirects=True, timeout=LINK_CHECK_TIMEOUT)
+            if response.status_code in (405, 501):
+                async with client.stream(
+                    "GET", url, headers={"Range": "bytes=0-0"}, follow_redirects=True, timeout=LINK_CHECK_TIMEOUT
+                ) as response:
+                    pass
+        except (httpx.HTTPError, httpx.InvalidURL):
+            # InvalidURL is not an HTTPError; one malformed URL must not end the pass
+            return None
+    
+    if response.status_code in LINK_DEAD_STATUSES:
+        return False
+    if response.status_code < 400:
+        return True
+    return None
+
+async def prune_dead_links(dry_run: bool = False, status: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Check every thumb / video URL in the category files and reels, then
+    prune (or mark, per LINK_CHECK_MODE) items with a dead URL: one batched
+    rewrite per category file through the mutation queue, one log record
+    for reels. Reels are left alone in mark mode; the pool has no marks and
+    refreshes replace it anyway. Results are cached for LINK_CHECK_TTL.
+    Progress goes into `status` when given.
+    """
+    if status is None:
+        status = {}
+    async with _link_check_lock:
+        results = _load_link_results()
+        now = time.time()
+        
+        sources = {}
+        for relpath in ensure_video_index():
+            try:
+                if is_stream_only(relpath):
+                    data = list(iter_stream_items(relpath))  # kept out of the catalog
+                else:
+                    data = catalog_data(load_catalog_entry(relpath))
+            except (OSError, UnicodeDecodeError, ValueError):
+                continue
+            if isinstance(data, list):
+                sources[relpath] = data
+        if LINK_CHECK_MODE != "mark":
+            sync_reels_pool()
+            sources["reelsvideo/reels.json"] = (_reels_cache["data"] or {}).get("reels", [])
         
-        if not fresh_reels:
-            raise HTTPException(status_code=502, detail="No data received from external API")
+        urls = set()
+        for items in sources.values():
+            for item in items:
+                if isinstance(item, dict):
+                    for field in ("video", "thumb"):
+                        url = item.get(field)
+                        if isinstance(url, str) and url.startswith("http"):
+                            urls.add(url)
         
-        # Update reels.json file atomically
-        reels_file = Path(DATA_DIR) / "reelsvideo" / "reels.json"
+        stale = [url for url in urls if url not in results or now - results[url][1] > LINK_CHECK_TTL]
+        status.update({"urls": len(urls), "to_check": len(stale), "checked": 0})
+        _write_link_check_status(status)
+        pending = iter(stale)
+        hosts: Dict[str, Dict[str, Any]] = {}
         
-        # Create directory if it doesn't exist
-        reels_file.parent.mkdir(parents=True, exist_ok=True)
+        async def worker():
+            # Workers share one iterator, so at most LINK_CHECK_CONCURRENCY checks run at once
+            for url in pending:
+                alive = await check_url(url, hosts)
+                inc_metric("link_checks_total", (("result", {True: "alive", False: "dead", None: "unknown"}[alive]),))
+                if alive is not None:
+                    results[url] = [alive, time.time()]
+                status["checked"] += 1
+                if status["checked"] % 500 == 0:
+                    _write_link_check_status(status)
         
-        # Create new JSON structure
-        updated_data = {
-            "reels": fresh_reels
-        }
+        await asyncio.gather(*(worker() for _ in range(LINK_CHECK_CONCURRENCY)))
+        for url in [url for url in results if url not in urls]:
+            del results[url]
+        dead = {url for url in urls if url in results and not results[url][0]}
         
-        # Atomic write
-        await write_reels_atomically(updated_data, reels_file)
+        per_file = {}
+        for relpath, items in sources.items():
+            file_urls = {
+                item["video"] for item in items
+                if isinstance(item, dict) and item.get("video")
+                and (item.get("video") in dead or item.get("thumb") in dead)
+                and not (LINK_CHECK_MODE == "mark" and item.get("dead"))
+            }
+            if file_urls:
+                per_file[relpath] = file_urls
+        
+        pruned = 0
+        if not dry_run and per_file:
+            category_files = dict(per_file)
+            reels_urls = category_files.pop("reelsvideo/reels.json", None)
+            if reels_urls:
+                pruned += await evict_reels(reels_urls)
+            
+            op = "mark_dead" if LINK_CHECK_MODE == "mark" else "delete"
+            outcome = await submit_mutations({
+                relpath: {"op": op, "urls": file_urls} for relpath, file_urls in category_files.items()
+            })
+            for relpath, removed in outcome.items():
+                if isinstance(removed, Exception):
+                    logging.error(f"Dead-link pruning failed for {relpath}: {str(removed)}")
+                else:
+                    pruned += sum(removed.values())
         
-        # Update cache
-        _reels_cache["data"] = updated_data
-        _reels_cache["timestamp"] = datetime.now()
+        _save_link_results(now)
+    
+    logging.info(
+        f"Dead-link check: {len(stale)} of {len(urls)} URLs checked, {len(dead)} dead, "
+        f"{pruned} item(s) {'marked' if LINK_CHECK_MODE == 'mark' else 'pruned'}"
+    )
+    return {
+        "urls": len(urls),
+        "checked": len(stale),
+        "dead": len(dead),
+        "items_pruned": pruned,
+        "files": {relpath: len(file_urls) for relpath, file_urls in per_file.items()},
+    }
+
+def _write_link_check_status(status: Dict[str, Any]):
+    if "state" not in status:
+        return
+    path = Path(LINK_CHECK_STATUS)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp") as tmp_file:
+        json.dump(status, tmp_file)
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, path)
+
+def read_link_check_status() -> Dict[str, Any]:
+    """The running or last dead-link pass, as recorded by whichever worker ran it"""
+    try:
+        with open(LINK_CHECK_STATUS, "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {"state": "idle"}
+    if status.get("state") == "running" and not _pid_alive(status.get("worker", 0)):
+        status["state"] = "interrupted"
+    return status
+
+async def _run_link_check(status: Dict[str, Any]):
+    try:
+        status["result"] = await prune_dead_links(status["dry_run"], status)
+        status["state"] = "done"
+    except asyncio.CancelledError:
+        status["state"] = "cancelled"
+        raise
+    except Exception as e:
+        logging.error(f"Dead-link check failed: {str(e)}")
+        status["state"] = "failed"
+        status["error"] = str(e)
+    finally:
+        status["finished"] = time.time()
+        _write_link_check_status(status)
+
+def start_link_check(dry_run: bool = False) -> Dict[str, Any]:
+    """Start a dead-link pass in the background; returns its initial status"""
+    status = {
+        "state": "running",
+        "dry_run": dry_run,
+        "mode": LINK_CHECK_MODE,
+        "worker": os.getpid(),
+        "started": time.time(),
+    }
+    _write_link_check_status(status)
+    _link_check["task"] = asyncio.create_task(_run_link_check(status))
+    return status
+
+def schedule_link_check():
+    """Start a dead-link pass in the background once LINK_CHECK_INTERVAL has passed"""
+    task = _link_check["task"]
+    if LINK_CHECK_INTERVAL <= 0 or (task is not None and not task.done()):
+        return
+    _load_link_results()
+    if time.time() - _link_check["last_pass"] >= LINK_CHECK_INTERVAL:
+        start_link_check()
+
+@app.post("/prune-dead-links", status_code=202)
+async def prune_dead_links_now(
+    dry_run: bool = Query(False, description="Only report dead links"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Start a dead-link pass in the background (a full pass can take an hour
+    at the per-host rate limit). Returns 202 with the pass status; poll
+    GET /prune-dead-links for progress and the result. If a pass is
+    already running in any worker, its status is returned instead.
+    """
+    status = read_link_check_status()
+    if status["state"] != "running":
+        status = start_link_check(dry_run)
+    return status
+
+@app.get("/prune-dead-links")
+async def prune_dead_links_status(api_key: str = Depends(verify_api_key)):
+    """Status, progress and result of the running or last dead-link pass"""
+    return read_link_check_status()
+
+@app.post("/refresh-reels")
+async def refresh_reels_data(api_key: str = Depends(verify_api_key)):
+    """Fetch fresh reels data and update reels.json file"""
+    try:
+        async with _refresh_lock:
+            # Fetch fresh data from external API
+            fresh_reels = await fetch_fresh_reels_data()
+            
+            if not fresh_reels:
+                raise HTTPException(status_code=502, detail="No data received from external API")
+            
+            # Merge into the rolling reels pool
+            result = await save_reels(fresh_reels)
+            record_refresh_attempt(True)
         
         return {
             "status": "success",
-            "message": f"Updated reels.json with {len(fresh_reels)} new videos",
-            "videos_count": len(fresh_reels)
+            "message": f"Added {result['added']} new videos to reels ({result['total']} total)",
+            "videos_count": len(fresh_reels),
+            **result
         }
         
     except HTTPException:
@@ -411,116 +3654,98 @@ async def refresh_reels_data(api_key: str = Depends(verify_api_key)):
         raise HTTPException(status_code=500, detail=f"Error updating reels data: {str(e)}")
 
 async def auto_refresh_reels():
-    """Background task to automatically refresh reels data every 5 minutes"""
+    """
+    Background task running in every worker.
+    
+    The worker holding the reels refresh lease fetches upstream once every
+    REELS_REFRESH_SECONDS (5 minutes), see reels_refresh_due. All other
+    workers only poll the file version and reload it when it changes.
+    """
     while True:
         try:
-            # Use lock to prevent multiple workers from refreshing simultaneously
-            async with _refresh_lock:
-                logging.info("Auto-refreshing reels data...")
-                
-                # Fetch fresh data
-                fresh_reels = await fetch_fresh_reels_data()
-                
-                if fresh_reels:
-                    # Update reels.json file atomically
-                    reels_file = Path(DATA_DIR) / "reelsvideo" / "reels.json"
-                    reels_file.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Create new JSON structure
-                    updated_data = {
-                        "reels": fresh_reels
-                    }
-                    
-                    # Atomic write with unique temp file
-                    import uuid
-                    temp_file = reels_file.with_suffix(f'.tmp.{uuid.uuid4().hex[:8]}')
+            # Pick up data written by the leader or a manual /refresh-reels
+            if sync_reels_pool():
+                logging.info(f"Worker {os.getpid()} reloaded reels data from file")
+            
+            if try_become_reels_leader() and reels_refresh_due():
+                async with _refresh_lock:
+                    logging.info("Auto-refreshing reels data...")
                     
+                    # Fetch fresh data; failures push the next attempt back
+                    fresh_reels = None
                     try:
-                        with open(temp_file, "w", encoding="utf-8") as f:
-                            json.dump(updated_data, f, indent=2, ensure_ascii=False)
-                            f.flush()
-                            os.fsync(f.fileno())  # Force write to disk
-                        
-                        # Atomic move to final location
-                        temp_file.replace(reels_file)
-                        
-                        # Update cache
-                        _reels_cache["data"] = updated_data
-                        _reels_cache["timestamp"] = datetime.now()
-                        
-                        logging.info(f"Auto-refresh completed: {len(fresh_reels)} videos updated")
-                        
-                    except Exception:
-                        # Clean up temp file on error
-                        if temp_file.exists():
-                            temp_file.unlink()
-                        raise
-                        
-                else:
-                    logging.warning("Auto-refresh failed: No data received")
+                        fresh_reels = await fetch_fresh_reels_data()
+                    finally:
+                        record_refresh_attempt(bool(fresh_reels))
                     
+                    if fresh_reels:
+                        result = await save_reels(fresh_reels)
+                        logging.info(
+                            f"Auto-refresh completed: {result['added']} added, "
+                            f"{result['evicted']} evicted, {result['total']} total"
+                        )
+                    else:
+                        logging.warning("Auto-refresh failed: No data received")
+            
+            if _leader["lock_file"] is not None:
+                schedule_link_check()
+                        
         except Exception as e:
             logging.error(f"Auto-refresh error: {str(e)}")
         
-        # Wait 5 minutes before next refresh
-        await asyncio.sleep(300)  # 300 seconds = 5 minutes
+        try:
+            # Keep this worker's totals visible to /metrics in other workers
+            dump_worker_metrics()
+        except OSError as e:
+            logging.error(f"Metrics dump failed: {str(e)}")
+        
+        await asyncio.sleep(REELS_POLL_SECONDS)
+
+async def warm_up_worker():
+    """
+    Finish warming a worker after it starts serving. The reels pool is
+    loaded first (the worker is ready then: files and pages come from the
+    snapshot), then category files are indexed one at a time, yielding to
+    requests in between. Requests that need an index before that finishes
+    build what is missing themselves.
+    """
+    sync_reels_pool()
+    _warmup["ready"] = True
+    _warmup["seconds"] = time.monotonic() - _warmup["started"]
+    logging.info(f"Worker {os.getpid()} ready after {_warmup['seconds'] * 1000:.1f} ms")
+    
+    for relpath in get_storage().list_paths("categoryvideo/"):
+        if relpath not in _indexed_files:
+            _index_catalog_file(relpath)
+        await asyncio.sleep(0)
+    _warmup["indexed"] = True
+    logging.info(f"Worker {os.getpid()} indexed all categories after {time.monotonic() - _warmup['started']:.3f}s")
 
 @app.on_event("startup")
 async def startup_event():
-    """Start background tasks when the application starts"""
+    """
+    Attach the shared catalog snapshot and start background work.
+    
+    Nothing slow runs here: warm_up_worker loads reels and builds the
+    indexes (from search terms precomputed in the snapshot) after startup,
+    and the upstream refresh (leader only, when reels are stale) is the
+    first tick of auto_refresh_reels. /ready reports when the worker is warm.
+    """
     global _background_task
     
-    # Only start background task in one worker (check if we're the first worker)
     worker_id = os.getpid()
+    _warmup["started"] = time.monotonic()
+    
+    # Serve pre-encoded data files from the snapshot shared by all workers
+    await load_shared_catalog()
+    
+    if _warmup["task"] is None:
+        _warmup["task"] = asyncio.create_task(warm_up_worker())
     
-    # Start the auto-refresh task only in first worker or single process
+    # Every worker runs the loop; only the leader fetches upstream
     if _background_task is None:
         _background_task = asyncio.create_task(auto_refresh_reels())
-        logging.info(f"Background auto-refresh task started in worker {worker_id} (every 5 minutes)")
-    
-    # Do initial refresh only once
-    try:
-        async with _refresh_lock:
-            reels_file = Path(DATA_DIR) / "reelsvideo" / "reels.json"
-            
-            # Only do initial refresh if file doesn't exist or is old
-            if not reels_file.exists() or _reels_cache["data"] is None:
-                fresh_reels = await fetch_fresh_reels_data()
-                if fresh_reels:
-                    reels_file.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    updated_data = {"reels": fresh_reels}
-                    
-                    # Use unique temp file for initial load too
-                    import uuid
-                    temp_file = reels_file.with_suffix(f'.tmp.{uuid.uuid4().hex[:8]}')
-                    
-                    try:
-                        with open(temp_file, "w", encoding="utf-8") as f:
-                            json.dump(updated_data, f, indent=2, ensure_ascii=False)
-                            f.flush()
-                            os.fsync(f.fileno())
-                        
-                        temp_file.replace(reels_file)
-                        
-                        _reels_cache["data"] = updated_data
-                        _reels_cache["timestamp"] = datetime.now()
-                        
-                        logging.info(f"Initial data loaded by worker {worker_id}: {len(fresh_reels)} videos")
-                        
-                    except Exception:
-                        if temp_file.exists():
-                            temp_file.unlink()
-                        raise
-            else:
-                # Load existing data into cache
-                with open(reels_file, "r", encoding="utf-8") as f:
-                    _reels_cache["data"] = json.load(f)
-                    _reels_cache["timestamp"] = datetime.fromtimestamp(reels_file.stat().st_mtime)
-                logging.info(f"Worker {worker_id} loaded existing data from cache")
-                
-    except Exception as e:
-        logging.error(f"Initial data load failed in worker {worker_id}: {str(e)}")
+        logging.info(f"Background reels task started in worker {worker_id}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -533,4 +3758,28 @@ async def shutdown_event():
             await _background_task
         except asyncio.CancelledError:
             pass
-        logging.info("Background auto-refresh task stopped")
\ No newline at end of file
+        logging.info("Background auto-refresh task stopped")
+    
+    for task in (_link_check["task"], _warmup["task"]):
+        if task is not None and not task.done():
+            task.cancel()
+    
+    release_reels_leadership()
+    await close_http_client()
+    dump_worker_metrics()
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Catalog storage maintenance")
+    parser.add_argument("command", choices=["import-sqlite", "export-json"])
+    parser.add_argument("--db", default=CATALOG_DB, help="SQLite catalog path")
+    args = parser.parse_args()
+    
+    logging.info(f"Running {args.command} against {args.db}")
+    if args.command == "import-sqlite":
+        count = import_json_to_sqlite(args.db)
+        print(f"Imported {count} category files into {args.db}")
+    else:
+        count = export_sqlite_to_json(args.db)
+        print(f"Exported {count} category files from {args.db}")
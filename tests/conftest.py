@@ -0,0 +1,53 @@
+"""
+Shared fixtures. main resolves DATA_DIR ("data") against the working
+directory at import time, so the session chdirs into a throwaway tree
+before importing it.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "bench"))
+
+
+@pytest.fixture(scope="session")
+def data_root(tmp_path_factory):
+    work = tmp_path_factory.mktemp("app")
+    (work / "data" / "categoryvideo").mkdir(parents=True)
+    (work / "data" / "reelsvideo").mkdir()
+    os.chdir(work)
+    os.environ["SESSION_SECRET"] = "test-key"
+    os.environ["LINK_CHECK_INTERVAL"] = "0"
+    return work
+
+
+@pytest.fixture
+def app(data_root):
+    """The main module with no category files and empty caches and indexes"""
+    import main
+
+    for path in (data_root / "data" / "categoryvideo").glob("*.json"):
+        path.unlink()
+    for relpath in list(main._indexed_files):
+        main.unindex_category_file(relpath)
+    for relpath in list(main._catalog):
+        main.invalidate_catalog_entry(relpath)
+    main._link_check["results"] = None
+    Path(main.LINK_CHECK_CACHE).unlink(missing_ok=True)
+    return main
+
+
+@pytest.fixture
+def category(data_root):
+    """Read or (with items) write data/categoryvideo/<name>.json"""
+    def category(name, items=None):
+        path = data_root / "data" / "categoryvideo" / f"{name}.json"
+        if items is not None:
+            path.write_text(json.dumps(items, indent=2), encoding="utf-8")
+        return json.loads(path.read_text(encoding="utf-8"))
+    return category
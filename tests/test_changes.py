@@ -0,0 +1,51 @@
+"""/changes merging: what a client that applied `since` still needs"""
+import asyncio
+
+
+def video(n, title=None):
+    return {"video_text": title or f"video {n}", "video": f"https://cdn.example/{n}.mp4"}
+
+
+def changes_since(app, since):
+    return asyncio.run(app.get_changes(since=since, prefix="categoryvideo/", api_key="test-key"))["changes"]
+
+
+def rewrite(app, category, name, items):
+    before = category(name)
+    category(name, items)
+    return asyncio.run(app.record_changes([app._diff_videos(f"categoryvideo/{name}.json", before, items)]))
+
+
+def test_added_then_removed_is_left_out(app, category):
+    category("a", [video(1)])
+    since = app._changes["version"]
+    rewrite(app, category, "a", [video(1), video(2)])
+    rewrite(app, category, "a", [video(1)])
+    assert changes_since(app, since) == {}
+
+
+def test_changed_then_removed_is_still_removed(app, category):
+    category("b", [video(1), video(2)])
+    since = app._changes["version"]
+    rewrite(app, category, "b", [video(1, "renamed"), video(2)])
+    rewrite(app, category, "b", [video(2)])
+    assert changes_since(app, since) == {"categoryvideo/b.json": {"add": [], "remove": [video(1)["video"]]}}
+
+
+def test_added_items_are_served_current(app, category):
+    category("c", [video(1)])
+    since = app._changes["version"]
+    rewrite(app, category, "c", [video(1), video(2)])
+    rewrite(app, category, "c", [video(1), video(2, "renamed")])
+    assert changes_since(app, since) == {"categoryvideo/c.json": {"add": [video(2, "renamed")], "remove": []}}
+
+
+def test_history_is_capped_by_size(app, category, monkeypatch):
+    monkeypatch.setattr(app, "CHANGES_MAX_BYTES", 2000)
+    category("d", [])
+    items = []
+    for n in range(40):
+        items = items + [video(n)]
+        rewrite(app, category, "d", items)
+    assert app._changes["offset"] <= 2000
+    assert app._changes["floor"] > 0
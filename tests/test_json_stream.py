@@ -0,0 +1,84 @@
+"""Chunked JSON array parsing (iter_json_items / iter_json_array)"""
+import io
+import json
+
+import pytest
+
+DOC = [
+    54549.29613357906,
+    -0.5,
+    1e-07,
+    12000.0,
+    7,
+    {"video_text": "Ünïcode \"quoted\" \\ text", "video": "https://cdn.example/1.mp4", "views": 10},
+    ["nested", [1, 2.5], {}],
+    True,
+    False,
+    None,
+    "",
+]
+
+
+def parse(app, text):
+    state = {}
+    items = [item for item, _ in app.iter_json_items(io.StringIO(text), state)]
+    return items, state["compact"]
+
+
+def reencode(app, text):
+    state = {}
+    body = b"".join(app.iter_json_array(io.StringIO(text), state))
+    return body, state["compact"]
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 7, 8, 64 * 1024])
+def test_items_survive_any_chunk_boundary(app, monkeypatch, chunk):
+    monkeypatch.setattr(app, "STREAM_CHUNK_BYTES", chunk)
+
+    assert parse(app, json.dumps(DOC, separators=(",", ":"), ensure_ascii=False)) == (DOC, True)
+    assert parse(app, json.dumps(DOC, indent=2)) == (DOC, False)
+    assert parse(app, "[54549.29613357906]") == ([54549.29613357906], True)
+    assert parse(app, "[1e5,2]") == ([100000.0, 2], True)
+
+
+def test_whitespace_anywhere(app, monkeypatch):
+    monkeypatch.setattr(app, "STREAM_CHUNK_BYTES", 3)
+
+    assert parse(app, " \n[ 1 ,\t2\r\n, [ 3 ] ]\n ") == ([1, 2, [3]], False)
+    assert parse(app, "[ ]") == ([], False)
+    assert parse(app, "[]") == ([], True)
+
+
+def test_compact_detection(app, monkeypatch):
+    monkeypatch.setattr(app, "STREAM_CHUNK_BYTES", 4)
+    compact = app.encode_json(DOC).decode("utf-8")
+
+    assert reencode(app, compact) == (compact.encode("utf-8"), True)
+    # Whitespace inside an item or a non-canonical form still round-trips, but is not compact
+    assert reencode(app, '[{"a": 1}]') == (b'[{"a":1}]', False)
+    assert reencode(app, '["\\u00e9"]') == ('["é"]'.encode("utf-8"), False)
+    assert reencode(app, json.dumps(DOC, indent=2)) == (compact.encode("utf-8"), False)
+
+
+@pytest.mark.parametrize("text", ['{"a": [1]}', '"[1]"', "1", "", "   ", "[1, 2", "[1 2]", "[1,]", "[1] [2]", "[1.5e]"])
+def test_rejects_anything_but_one_array(app, monkeypatch, text):
+    monkeypatch.setattr(app, "STREAM_CHUNK_BYTES", 2)
+
+    with pytest.raises(ValueError):
+        parse(app, text)
+
+
+def test_stream_only_category_pages_without_caching(app, category, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    category("5", [{"video_text": f"video {n}", "video": f"https://cdn.example/{n}.mp4"} for n in range(30)])
+    monkeypatch.setattr(app, "CATALOG_MAX_ENTRY_BYTES", 100)
+    client = TestClient(app.app)
+    headers = {"X-API-Key": "test-key"}
+
+    page = client.get("/categories/5/videos?page=2&limit=8&fields=video", headers=headers).json()
+
+    assert page["total_items"] == 30 and page["total_pages"] == 4
+    assert page["videos"] == [{"video": f"https://cdn.example/{n}.mp4"} for n in range(8, 16)]
+    assert "categoryvideo/5.json" not in app._catalog
+    assert client.get("/categories/5/videos?cursor=", headers=headers).status_code == 413
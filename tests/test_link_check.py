@@ -0,0 +1,117 @@
+"""Dead-link checker against the local CDN stub in bench/stub_upstream.py"""
+import asyncio
+
+import pytest
+
+from stub_upstream import StubUpstream
+
+
+@pytest.fixture
+def stub():
+    stub = StubUpstream(latency=0.01).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture(autouse=True)
+def fast_checks(app, monkeypatch):
+    # The default 5 requests/s per host would make every test take seconds
+    monkeypatch.setattr(app, "LINK_CHECK_HOST_RPS", 1000)
+
+
+def video(stub, status, n):
+    return {"video_text": f"video {n}", "video": stub.link(status, f"{n}.mp4"), "thumb": stub.link(200, f"{n}.jpg")}
+
+
+def mixed_items(stub):
+    return [
+        video(stub, 200, 1),
+        video(stub, 404, 2),
+        video(stub, 410, 3),
+        video(stub, 500, 4),
+        video(stub, "nohead", 5),
+        {"video_text": "video 6", "video": "http://[::1/broken", "thumb": stub.link(200, "6.jpg")},
+        {**video(stub, 200, 7), "thumb": stub.link(404, "7.jpg")},
+    ]
+
+
+def titles(items):
+    return [item["video_text"] for item in items]
+
+
+def test_prunes_items_with_dead_video_or_thumb(app, stub, category):
+    category("1", mixed_items(stub))
+
+    result = asyncio.run(app.prune_dead_links())
+
+    assert result["dead"] == 3
+    assert result["items_pruned"] == 3
+    # 5xx and malformed URLs are unknown, never dead
+    assert titles(category("1")) == ["video 1", "video 4", "video 5", "video 6"]
+
+
+def test_head_not_allowed_falls_back_to_ranged_get(app, stub, category):
+    category("1", [video(stub, "nohead", 1)])
+
+    asyncio.run(app.prune_dead_links())
+
+    methods = [method for method, path, _ in stub.link_hits if path.endswith("/1.mp4")]
+    assert methods == ["HEAD", "GET"]
+    assert titles(category("1")) == ["video 1"]
+
+
+def test_dry_run_changes_nothing(app, stub, category):
+    items = category("1", mixed_items(stub))
+
+    result = asyncio.run(app.prune_dead_links(dry_run=True))
+
+    assert result["dead"] == 3
+    assert result["items_pruned"] == 0
+    assert category("1") == items
+
+
+def test_mark_mode_flags_instead_of_deleting(app, stub, category, monkeypatch):
+    monkeypatch.setattr(app, "LINK_CHECK_MODE", "mark")
+    category("1", mixed_items(stub))
+
+    asyncio.run(app.prune_dead_links())
+
+    items = category("1")
+    assert len(items) == 7
+    assert [item["video_text"] for item in items if item.get("dead")] == ["video 2", "video 3", "video 7"]
+
+
+def test_mark_mode_leaves_reels_alone(app, stub, monkeypatch):
+    monkeypatch.setattr(app, "LINK_CHECK_MODE", "mark")
+    reel = video(stub, 404, 8)
+    asyncio.run(app.save_reels([reel]))
+    try:
+        result = asyncio.run(app.prune_dead_links())
+
+        assert result["items_pruned"] == 0
+        assert reel["video"] in {r["video"] for r in app._reels_pool["items"]}
+    finally:
+        asyncio.run(app.evict_reels({reel["video"]}))
+
+
+def test_results_are_cached_except_unknown(app, stub, category):
+    category("1", mixed_items(stub))
+    asyncio.run(app.prune_dead_links(dry_run=True))
+
+    result = asyncio.run(app.prune_dead_links(dry_run=True))
+
+    # Only the 5xx and the malformed URL are checked again
+    assert result["checked"] == 2
+
+
+def test_per_host_concurrency_and_rate(app, stub, category, monkeypatch):
+    monkeypatch.setattr(app, "LINK_CHECK_PER_HOST", 2)
+    monkeypatch.setattr(app, "LINK_CHECK_HOST_RPS", 40)
+    category("1", [video(stub, 200, n) for n in range(10)])
+
+    asyncio.run(app.prune_dead_links())
+
+    starts = sorted(start for _, _, start in stub.link_hits)
+    assert len(starts) == 20
+    assert stub.max_link_in_flight <= 2
+    assert starts[-1] - starts[0] >= 19 / 40 * 0.8
@@ -0,0 +1,153 @@
+"""Coalesced category mutations across worker processes (submit_mutations)"""
+import asyncio
+import fcntl
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+FILES = ["categoryvideo/1.json", "categoryvideo/2.json", "categoryvideo/3.json"]
+ITEMS_PER_FILE = 40
+
+
+def url(relpath, i):
+    return f"https://example.com/embed/{relpath.split('/')[1][:-5]}-{i}"
+
+
+def delete_worker(index, requests, barrier, queue):
+    """One worker process: submit every request at once, as concurrent DELETEs would"""
+    import main
+
+    main.ensure_video_index()
+    storage = main.get_storage()
+    write = storage.write
+    writes = {}
+
+    def counting_write(relpath, data):
+        writes[relpath] = writes.get(relpath, 0) + 1
+        write(relpath, data)
+        time.sleep(0.05)  # hold the file lock a little so the workers collide
+
+    storage.write = counting_write
+
+    async def run():
+        return await asyncio.gather(*(
+            main.submit_mutations({relpath: {"op": "delete", "urls": set(urls)} for relpath, urls in request.items()})
+            for request in requests
+        ))
+
+    barrier.wait()
+    queue.put((index, asyncio.run(run()), writes))
+
+
+def run_workers(*worker_requests):
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(len(worker_requests))
+    queue = context.Queue()
+    processes = [
+        context.Process(target=delete_worker, args=(i, requests, barrier, queue))
+        for i, requests in enumerate(worker_requests)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = sorted(queue.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+    return [(results, writes) for _, results, writes in outcomes]
+
+
+@pytest.fixture
+def files(app, category):
+    for relpath in FILES:
+        name = relpath.split("/")[1][:-5]
+        category(name, [{"video_text": f"video {i}", "video": url(relpath, i)} for i in range(ITEMS_PER_FILE)])
+    return category
+
+
+def remaining(files, relpath):
+    return [item["video"] for item in files(relpath.split("/")[1][:-5])]
+
+
+def test_concurrent_workers_lose_no_updates(files):
+    # Worker A deletes i % 4 == 0, worker B i % 4 == 1, one request per URL
+    requests_a = [{relpath: [url(relpath, i)]} for relpath in FILES for i in range(0, ITEMS_PER_FILE, 4)]
+    requests_b = [{relpath: [url(relpath, i)]} for relpath in FILES for i in range(1, ITEMS_PER_FILE, 4)]
+
+    (results_a, writes_a), (results_b, writes_b) = run_workers(requests_a, requests_b)
+
+    for relpath in FILES:
+        assert remaining(files, relpath) == [url(relpath, i) for i in range(ITEMS_PER_FILE) if i % 4 > 1]
+    for requests, results in ((requests_a, results_a), (requests_b, results_b)):
+        for request, result in zip(requests, results):
+            (relpath, (deleted,)), = request.items()
+            assert result == {relpath: {deleted: 1}}
+
+
+def test_one_rewrite_per_file_per_batch(files):
+    requests_a = [{relpath: [url(relpath, i)]} for relpath in FILES for i in range(0, 10)]
+    requests_b = [{relpath: [url(relpath, i)]} for relpath in FILES for i in range(10, 20)]
+
+    (_, writes_a), (_, writes_b) = run_workers(requests_a, requests_b)
+
+    # Each worker's requests fall in one batch window: one write per file each
+    assert writes_a == {relpath: 1 for relpath in FILES}
+    assert writes_b == {relpath: 1 for relpath in FILES}
+
+
+def test_overlapping_requests_are_credited_once(files):
+    shared = {FILES[0]: [url(FILES[0], 0), url(FILES[0], 1)]}
+    requests_a = [shared, {FILES[1]: [url(FILES[1], 5)]}, shared]
+    requests_b = [shared, {FILES[0]: [url(FILES[0], 1), "https://example.com/embed/missing"]}]
+
+    (results_a, _), (results_b, _) = run_workers(requests_a, requests_b)
+
+    credited = {}
+    for result in results_a + results_b:
+        for counts in result.values():
+            for deleted, n in counts.items():
+                credited[deleted] = credited.get(deleted, 0) + n
+    # Every URL that existed is credited to exactly one request, across both workers
+    assert credited == {url(FILES[0], 0): 1, url(FILES[0], 1): 1, url(FILES[1], 5): 1}
+    assert results_a[1] == {FILES[1]: {url(FILES[1], 5): 1}}
+    assert url(FILES[0], 0) not in remaining(files, FILES[0])
+    assert url(FILES[0], 1) not in remaining(files, FILES[0])
+    assert len(remaining(files, FILES[0])) == ITEMS_PER_FILE - 2
+
+
+def hold_lock(path, seconds, ready):
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        ready.set()
+        time.sleep(seconds)
+
+
+def test_lock_waiters_do_not_starve_the_holder(files):
+    import main
+
+    main.ensure_video_index()
+    lock_path = Path(main.DATA_DIR) / ".locks" / "categoryvideo_1.json.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+    holder = context.Process(target=hold_lock, args=(str(lock_path), 1.0, ready))
+    holder.start()
+    assert ready.wait(5)
+
+    async def run():
+        # A tiny default pool: waiters must not need threads to wait
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        tasks = []
+        for i in range(10):
+            # Apart by more than the batch window, so each is its own flush
+            tasks.append(asyncio.create_task(main.submit_mutations({FILES[0]: {"op": "delete", "urls": {url(FILES[0], i)}}})))
+            await asyncio.sleep(main.MUTATION_BATCH_WINDOW + 0.01)
+        return await asyncio.wait_for(asyncio.gather(*tasks), 10)
+
+    results = asyncio.run(run())
+    holder.join()
+
+    assert results == [{FILES[0]: {url(FILES[0], i): 1}} for i in range(10)]
+    assert remaining(files, FILES[0]) == [url(FILES[0], i) for i in range(10, ITEMS_PER_FILE)]